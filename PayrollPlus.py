@@ -1,18 +1,25 @@
 import pandas as pd
+import numpy as np
 import logging
 import sys
 import os
 import glob
-import shutil
+import fnmatch
 import re
+import hashlib
+import shutil
+import tempfile
+import time
 from datetime import datetime, timedelta
 from typing import Dict, Optional, Tuple, List
-from dataclasses import dataclass
-from openpyxl import load_workbook
+from dataclasses import dataclass, field
+from openpyxl import Workbook, load_workbook
 from openpyxl.utils import get_column_letter
 from openpyxl.styles import Font, Alignment
 from pathlib import Path
 from collections import defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
 
 logger = logging.getLogger('commission_processor')
 
@@ -20,6 +27,47 @@ logger = logging.getLogger('commission_processor')
 LOCATION_ID = 'L100'
 COMPANY_CODE = 'J6P'
 
+# Combine settings: 'memory' builds the week snapshot straight from the source
+# workbooks, 'workbook' streams them into combined_data.xlsx and parses it back
+COMBINE_MODE = 'memory'
+# Write combined_data.xlsx as an audit artifact when combining in memory
+WRITE_COMBINED_AUDIT = True
+# Rows buffered per sheet to size the columns of a streamed combine
+AUTOFIT_SAMPLE_ROWS = 1000
+
+# Cache of parsed input sheets, keyed by file content hash and sheet name.
+# Set SHEET_CACHE_DIR to None to always parse the Excel files.
+SHEET_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.payroll_sheet_cache')
+SHEET_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# ProcessPoolExecutor rejects more than 61 workers on Windows
+MAX_POOL_WORKERS = 61
+
+# Worker processes used to parse the input workbooks concurrently (1 parses them in turn)
+PARSE_WORKERS = min(5, os.cpu_count() or 1)
+
+# Hours excused for each day marked in the time off workbook, and the markers that count
+TIME_OFF_HOURS_PER_DAY = 8
+TIME_OFF_MARKERS = ['x', 'r', 'v']
+
+# Commission engine: 'grouped' computes every service tech's job metrics with one set of
+# group-by aggregations, 'per_tech' runs the original per-technician filters and loops.
+# A verbose audit (AUDIT_LOGGING) always uses 'per_tech' for its per-job narration.
+COMMISSION_ENGINE = 'grouped'
+# Worker processes for the 'per_tech' engine (1 computes the technicians in turn),
+# capped at MAX_POOL_WORKERS and the number of service techs when the pool starts
+COMMISSION_WORKERS = os.cpu_count() or 1
+
+# Worker processes that serialize the output workbooks concurrently (1 writes them in turn)
+OUTPUT_WORKERS = min(6, os.cpu_count() or 1)
+
+# Verbose audit: write the per-job and per-threshold narration to the log file. The narration
+# comes from the 'per_tech' engine, which a verbose audit runs whatever COMMISSION_ENGINE says.
+# When off, the log file gets INFO and above and the calculations skip building debug messages.
+AUDIT_LOGGING = False
+# Jobs narrated per technician and section during a verbose audit
+AUDIT_JOBS_PER_TECH = 25
+
 # Column order for output
 COLUMN_ORDER = [
     'Badge ID', 'Technician', 'Main Dept',
@@ -54,6 +102,13 @@ COLUMN_ORDER = [
     'Status', 'Total Commission'
 ]
 
+# Department and subdepartment amounts, kept as numbers through the calculations and
+# rendered as "$1,234.56" only in paystats.xlsx
+PAYSTATS_CURRENCY_COLUMNS = [
+    col for col in COLUMN_ORDER
+    if col[:2].isdigit() or col.split(' ', 1)[0] in ('HVAC', 'Plumbing', 'Electric')
+]
+
 # Define threshold tables
 HVAC_THRESHOLDS = {
     0: [7000, 8000, 9000, 10000],
@@ -83,6 +138,13 @@ PLUMBING_ELECTRICAL_THRESHOLDS = {
     100: [18000, 20000, 22000, 24000]
 }
 
+# Threshold tables as arrays for get_commission_rates, one row per ICP level (0, 10, ..., 100)
+HVAC_THRESHOLD_ARRAY = np.array([HVAC_THRESHOLDS[icp] for icp in range(0, 101, 10)], dtype=float)
+PLUMBING_ELECTRICAL_THRESHOLD_ARRAY = np.array(
+    [PLUMBING_ELECTRICAL_THRESHOLDS[icp] for icp in range(0, 101, 10)], dtype=float
+)
+COMMISSION_TIER_RATES = np.array([0.02, 0.03, 0.04, 0.05])
+
 # Department code mapping
 DEPARTMENT_CODES = {
     '20': {'code': '2000000', 'desc': 'HVAC SERVICE'},
@@ -101,7 +163,64 @@ DEPARTMENT_CODES = {
 }
 
 
+# Input filenames in the Downloads folder
+DATED_FILE_PREFIXES = {
+    'tech': "Technician Department_Dated ",
+    'tgl': "TGLs Set _Dated ",
+    'jobs': "Copy of Jobs Report for Performance -DE2_Dated "
+}
+UUID_FILE_PATTERN = "????????-????-????-????-????????????.xlsx"
+TIME_OFF_FILENAME = "Approved_Time_Off 2023.xlsx"
+
+class InputFileIndex:
+    """Single scan of an input directory, classifying each file by type and filename date range."""
+    # Indexes already built, keyed by directory and rebuilt when its mtime changes
+    _indexes = {}
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.dated_files = defaultdict(list)  # file type -> [(filename, (start, end) or None)]
+        self.uuid_files = []
+        self.time_off_file = None
+
+        with os.scandir(directory) as entries:
+            names = sorted(entry.name for entry in entries if entry.is_file() and not entry.name.startswith('.'))
+
+        for name in names:
+            normalized = os.path.normcase(name)
+            if fnmatch.fnmatch(name, UUID_FILE_PATTERN):
+                self.uuid_files.append(os.path.join(directory, name))
+            if normalized == os.path.normcase(TIME_OFF_FILENAME):
+                self.time_off_file = os.path.join(directory, name)
+            for file_type, prefix in DATED_FILE_PREFIXES.items():
+                if normalized.startswith(os.path.normcase(prefix)) and normalized.endswith('.xlsx'):
+                    self.dated_files[file_type].append((name, DateValidator.parse_filename_date_range(name)))
+
+    @classmethod
+    def for_directory(cls, directory: str) -> 'InputFileIndex':
+        """Return the index for a directory, rescanning only if the directory has changed."""
+        key = os.path.abspath(directory)
+        mtime = os.stat(directory).st_mtime_ns
+        cached = cls._indexes.get(key)
+        if cached is None or cached[0] != mtime:
+            cls._indexes[key] = (mtime, cls(directory))
+        return cls._indexes[key][1]
+
+    def files_for_week(self, file_type: str, start_week: datetime, end_week: datetime) -> List[str]:
+        """Files of a type whose filename date range is exactly the given week, canonical name first."""
+        expected_name = (f"{DATED_FILE_PREFIXES[file_type]}{DateValidator.format_date_for_comparison(start_week)} - "
+                         f"{DateValidator.format_date_for_comparison(end_week)}.xlsx")
+        matches = [
+            name for name, date_range in self.dated_files[file_type]
+            if date_range and date_range[0].date() == start_week.date() and date_range[1].date() == end_week.date()
+        ]
+        matches.sort(key=lambda name: os.path.normcase(name) != os.path.normcase(expected_name))
+        return [os.path.join(self.directory, name) for name in matches]
+
 class DateValidator:
+    # 'Posted On' ranges already scanned, keyed by (path, mtime, size)
+    _uuid_date_ranges = {}
+
     @staticmethod
     def parse_filename_date_range(filename: str) -> Optional[Tuple[datetime, datetime]]:
         pattern = r'(\d{2}_\d{2}_\d{2})\s*-\s*(\d{2}_\d{2}_\d{2})'
@@ -141,29 +260,55 @@ class DateValidator:
         """Format date as MM/DD/YY for display"""
         return date.strftime('%m/%d/%y')
 
+    @staticmethod
+    def scan_posted_on_range(file_path: str) -> Optional[Tuple[datetime, datetime]]:
+        """Stream only the 'Posted On' column of Direct Payroll Adjustments and return its min and max."""
+        workbook = load_workbook(filename=file_path, read_only=True, data_only=True)
+        try:
+            worksheet = workbook['Direct Payroll Adjustments']
+            worksheet.reset_dimensions()
+            header = next(worksheet.iter_rows(max_row=1, values_only=True), None)
+            if header is None or 'Posted On' not in header:
+                return None
+            col = header.index('Posted On') + 1
+
+            earliest_date = latest_date = None
+            for (value,) in worksheet.iter_rows(min_row=2, min_col=col, max_col=col, values_only=True):
+                if value is None or value == '':
+                    continue
+                if not isinstance(value, datetime):
+                    value = pd.to_datetime(value)
+                    if pd.isna(value):
+                        continue
+                    value = value.to_pydatetime()
+                if earliest_date is None or value < earliest_date:
+                    earliest_date = value
+                if latest_date is None or value > latest_date:
+                    latest_date = value
+        finally:
+            workbook.close()
+
+        if earliest_date is None:
+            return None
+        return earliest_date, latest_date
+
     @classmethod
     def analyze_uuid_file_dates(cls, file_path: str) -> Optional[Tuple[datetime, datetime]]:
         """Analyze UUID file dates from Direct Payroll Adjustments sheet"""
         try:
-            df = pd.read_excel(file_path, sheet_name='Direct Payroll Adjustments')
-            
-            if 'Posted On' not in df.columns:
-                return None
-                
-            if not pd.api.types.is_datetime64_any_dtype(df['Posted On']):
-                df['Posted On'] = pd.to_datetime(df['Posted On'])
-            
-            # Get min and max dates from Posted On column, excluding NaN values
-            valid_dates = df['Posted On'].dropna()
-            if valid_dates.empty:
+            stat = os.stat(file_path)
+            cache_key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+            if cache_key not in cls._uuid_date_ranges:
+                cls._uuid_date_ranges[cache_key] = cls.scan_posted_on_range(file_path)
+            date_range = cls._uuid_date_ranges[cache_key]
+            if date_range is None:
                 return None
                 
-            earliest_date = valid_dates.min()
-            latest_date = valid_dates.max()
+            earliest_date, latest_date = date_range
             
             print(f"\n\"Posted On\"column in UUID file date range: {earliest_date.strftime('%m/%d/%y')} to {latest_date.strftime('%m/%d/%y')}")
             
-            return earliest_date.to_pydatetime(), latest_date.to_pydatetime()
+            return earliest_date, latest_date
             
         except Exception as e:
             print(f"\nDEBUG: Error in analyze_uuid_file_dates: {str(e)}")
@@ -172,30 +317,23 @@ class DateValidator:
     @classmethod
     def validate_files_for_date(cls, directory: str, user_date: datetime) -> Tuple[bool, List[str], Optional[List[str]], dict]:
         start_week, end_week = cls.get_week_range(user_date, show_message=True)
-        expected_start = cls.format_date_for_comparison(start_week)
-        expected_end = cls.format_date_for_comparison(end_week)
 
         errors = []
         found_files = {}
 
-        file_patterns = {
-            'tech': f"Technician Department_Dated {expected_start} - {expected_end}.xlsx",
-            'tgl': f"TGLs Set _Dated {expected_start} - {expected_end}.xlsx",
-            'jobs': f"Copy of Jobs Report for Performance -DE2_Dated {expected_start} - {expected_end}.xlsx"
-        }
+        # One directory scan answers every file type and week
+        index = InputFileIndex.for_directory(directory)
 
         # Check each expected file
-        for file_type, expected_pattern in file_patterns.items():
-            matching_files = glob.glob(os.path.join(directory, expected_pattern))
+        for file_type in DATED_FILE_PREFIXES:
+            matching_files = index.files_for_week(file_type, start_week, end_week)
             
             if not matching_files:
                 # Check if files exist with different dates
-                pattern_base = expected_pattern.split('Dated')[0] + "Dated *"
-                existing_files = glob.glob(os.path.join(directory, pattern_base))
+                existing_files = index.dated_files[file_type]
                 if existing_files:
                     # Found files but wrong week
-                    example_file = os.path.basename(existing_files[0])
-                    date_range = cls.parse_filename_date_range(example_file)
+                    example_file, date_range = existing_files[0]
                     if date_range:
                         actual_start, actual_end = date_range
                         errors.append(
@@ -211,17 +349,16 @@ class DateValidator:
                 found_files[file_type] = matching_files[0]
 
         # Check UUID files
-        uuid_files = glob.glob(os.path.join(directory, "????????-????-????-????-????????????.xlsx"))
+        uuid_files = list(index.uuid_files)
         if not uuid_files:
             errors.append("Missing UUID file")
             return len(errors) == 0, errors, None, {}
         
         # Time off file
-        time_off_file = os.path.join(directory, "Approved_Time_Off 2023.xlsx")
-        if not os.path.exists(time_off_file):
+        if index.time_off_file is None:
             errors.append("Missing Time Off file")
         else:
-            found_files['time_off'] = time_off_file
+            found_files['time_off'] = index.time_off_file
 
         return len(errors) == 0, errors, uuid_files, found_files
 
@@ -407,6 +544,12 @@ def determine_tech_type(business_unit: str) -> str:
         logger.error(f"Error determining tech type for business unit {business_unit}: {str(e)}")
         return 'ADMIN'  # Default to ADMIN in case of errors
 
+# Pay codes: PCM (Service Tech), ICM (Installer), SPF (Spiffs/TGL)
+VALID_PAY_CODES = ['PCM', 'ICM', 'SPF']
+
+# Columns of payroll.xlsx and Spiffs.xlsx, in PayrollEntry field order
+PAYROLL_COLUMNS = ['Company Code', 'Badge ID', 'Date', 'Amount', 'Pay Code', 'Dept', 'Location ID']
+
 # Dataclass definitions
 @dataclass
 class PayrollEntry:
@@ -420,9 +563,324 @@ class PayrollEntry:
 
     def __post_init__(self):
         """Validate pay code after initialization."""
-        valid_codes = {'PCM', 'ICM', 'SPF'}
-        if self.pay_code and self.pay_code not in valid_codes:
-            raise ValueError(f"Invalid pay code: {self.pay_code}. Must be one of: {', '.join(valid_codes)}")
+        if self.pay_code and self.pay_code not in VALID_PAY_CODES:
+            raise ValueError(f"Invalid pay code: {self.pay_code}. Must be one of: {', '.join(VALID_PAY_CODES)}")
+
+@dataclass
+class PayrollBatch:
+    """Payroll rows held as columns: a frame with PAYROLL_COLUMNS, 'Amount' as float.
+
+    Each stage builds its PCM, ICM or SPF rows in one from_columns call and the
+    batches are joined with concat; from_entries wraps a list of PayrollEntry.
+    """
+    frame: pd.DataFrame
+
+    @classmethod
+    def from_columns(cls, badge_id, amount, dept, pay_code, date,
+                     company_code=COMPANY_CODE, location_id=LOCATION_ID) -> 'PayrollBatch':
+        """Batch from column values; scalars are repeated for every row."""
+        def column(values):
+            return values if np.isscalar(values) else np.asarray(values, dtype=object)
+
+        frame = pd.DataFrame({
+            'Company Code': column(company_code),
+            'Badge ID': column(badge_id),
+            'Date': column(date),
+            'Amount': np.asarray(amount, dtype=float),
+            'Pay Code': column(pay_code),
+            'Dept': column(dept),
+            'Location ID': column(location_id),
+        }, columns=PAYROLL_COLUMNS)
+        invalid = frame.loc[(frame['Pay Code'] != '') & ~frame['Pay Code'].isin(VALID_PAY_CODES), 'Pay Code']
+        if not invalid.empty:
+            raise ValueError(f"Invalid pay code: {invalid.iloc[0]}. Must be one of: {', '.join(VALID_PAY_CODES)}")
+        return cls(frame)
+
+    @classmethod
+    def from_entries(cls, entries: List[PayrollEntry]) -> 'PayrollBatch':
+        """Batch holding the given PayrollEntry rows in order."""
+        return cls.from_columns(
+            [entry.badge_id for entry in entries],
+            [entry.amount for entry in entries],
+            [entry.dept for entry in entries],
+            [entry.pay_code for entry in entries],
+            [entry.date for entry in entries],
+            [entry.company_code for entry in entries],
+            [entry.location_id for entry in entries],
+        )
+
+    @classmethod
+    def concat(cls, batches: List['PayrollBatch']) -> 'PayrollBatch':
+        """One batch with the rows of every batch, in order."""
+        return cls(pd.concat([batch.frame for batch in batches], ignore_index=True))
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+# Sheets of combined_data.xlsx held by WeekSnapshot (field name -> sheet name)
+SNAPSHOT_SHEETS = {
+    'jobs': 'Sheet1',
+    'tech': 'Sheet1_Tech',
+    'tgl': 'Sheet1_TGL',
+    'invoices': 'Invoices',
+    'adjustments': 'Direct Payroll Adjustments'
+}
+
+# Sheet schemas applied once at load: the columns the stages read and their types.
+# Only the listed columns are parsed. Types: 'str', 'datetime', 'money' ('$1,234.50' -> 1234.5,
+# blank or unparsable -> NaN, see parse_money_column), None keeps the parsed value.
+SHEET_SCHEMAS = {
+    'Sheet1': {'columns': {
+        'Invoice #': None,
+        'Invoice Date': 'datetime',
+        'Customer Name': 'str',
+        'Business Unit': 'str',
+        'Jobs Total Revenue': 'money',
+        'GP': 'money',
+        'Opportunity': None,
+        'Primary Technician': 'str',
+        'Sold By': 'str'
+    }},
+    'Sheet1_Tech': {'columns': {
+        'Name': 'str',
+        'Payroll ID': 'str',
+        'Technician Business Unit': 'str'
+    }},
+    'Sheet1_TGL': {'columns': {
+        'Job #': None,
+        'Lead Generated By': 'str',
+        'Status': 'str',
+        'Business Unit': 'str',
+        'Lead Generated from Business Unit': 'str',
+        'Created Date': 'datetime'
+    }},
+    'Invoices': {'columns': {
+        'Technician': 'str',
+        'Business Unit': 'str',
+        'GP': 'money',
+        'Total': 'money',
+        'Cost': 'money',
+        'Subtotal': 'money'
+    }},
+    'Direct Payroll Adjustments': {'columns': {
+        'Technician': 'str',
+        'Amount': 'money',
+        'Memo': 'str',
+        'Posted On': 'datetime'
+    }},
+    # Year sheets of the time off workbook have no header row, so they are read whole as text
+    'Time Off': {'columns': None, 'read': {'header': None, 'dtype': str}}
+}
+
+def schema_read_options(schema_name: Optional[str]) -> dict:
+    """pd.read_excel options projecting a sheet onto its schema columns."""
+    schema = SHEET_SCHEMAS.get(schema_name)
+    if schema is None:
+        return {}
+    options = dict(schema.get('read', {}))
+    columns = schema['columns']
+    if columns is not None:
+        options['usecols'] = lambda col: col in columns
+        options['dtype'] = {col: str for col, kind in columns.items() if kind == 'str'}
+    return options
+
+def parse_money_column(values: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """Convert a money column to float in one pass: '$1,234.50' -> 1234.5.
+
+    Returns the parsed column (blank and unparsable values become NaN) and a mask
+    of the non-blank values that could not be parsed.
+    """
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return values.astype(float), pd.Series(False, index=values.index)
+    text = values.astype('string').str.strip()
+    parsed = pd.to_numeric(text.str.replace(r'[$,]', '', regex=True), errors='coerce').astype(float)
+    blank = values.isna() | (text == '').fillna(True)
+    return parsed, parsed.isna() & ~blank
+
+def apply_sheet_schema(df: pd.DataFrame, schema_name: Optional[str]) -> pd.DataFrame:
+    """Convert the schema's datetime and money columns of a parsed sheet.
+
+    Money values that could not be parsed are listed in df.attrs['unparsed_money']
+    with their Excel row number, column and original value.
+    """
+    schema = SHEET_SCHEMAS.get(schema_name)
+    if schema is None or schema['columns'] is None:
+        return df
+    unparsed_money = []
+    for col, kind in schema['columns'].items():
+        if col not in df.columns:
+            continue
+        if kind == 'datetime':
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+        elif kind == 'money':
+            parsed, unparsed = parse_money_column(df[col])
+            unparsed_money.extend(
+                {'Row': idx + 2, 'Column': col, 'Value': value}
+                for idx, value in df.loc[unparsed, col].items()
+            )
+            df[col] = parsed
+    df.attrs['unparsed_money'] = unparsed_money
+    return df
+
+def week_bounds(base_date: datetime) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """Monday 00:00 of the week containing base_date and Monday 00:00 of the next week."""
+    start = pd.Timestamp(base_date.date()) - pd.Timedelta(days=base_date.weekday())
+    return start, start + pd.Timedelta(days=7)
+
+def in_week_mask(dates: pd.Series, base_date: datetime) -> pd.Series:
+    """True for datetimes in the Monday-Sunday week containing base_date (never for NaT)."""
+    start, end = week_bounds(base_date)
+    return (dates >= start) & (dates < end)
+
+@dataclass
+class SpiffPivot:
+    """Positive spiff totals per technician, built once from 'Direct Payroll Adjustments' by build_spiff_pivot.
+
+    positive: technician x subdepartment code, the memo's first two characters (commission and display)
+    positive_by_department: technician x HVAC / Plumbing / Electric, from the same code
+    pcm_positive: technician x subdepartment code read by extract_dept_code (PCM entries)
+    invalid_memos: warning per positive spiff whose memo has no department code in 20-49
+    Every total adds the amounts in sheet row order.
+    """
+    positive: pd.DataFrame
+    positive_by_department: pd.DataFrame
+    pcm_positive: pd.DataFrame
+    invalid_memos: pd.DataFrame
+
+    @staticmethod
+    def _row(frame: pd.DataFrame, tech_name: str) -> Dict[str, float]:
+        return frame.loc[tech_name].to_dict() if tech_name in frame.index else {}
+
+    def positive_for(self, tech_name: str) -> Dict[str, float]:
+        """Positive spiffs of one technician by subdepartment code."""
+        return self._row(self.positive, tech_name)
+
+    def positive_by_department_for(self, tech_name: str) -> Dict[str, float]:
+        """Positive spiffs of one technician by main department."""
+        return self._row(self.positive_by_department, tech_name)
+
+    def pcm_positive_for(self, tech_name: str) -> Dict[str, float]:
+        """Positive spiffs of one technician by PCM subdepartment code."""
+        return self._row(self.pcm_positive, tech_name)
+
+    def report_invalid_memos(self, tech_names: List[str]):
+        """Log the invalid-memo warnings of the given technicians, in their order."""
+        warnings = self.invalid_memos.groupby('Technician', sort=False)['Warning'].agg(list)
+        for tech_name in tech_names:
+            for warning in warnings.get(tech_name, []):
+                logger.warning(warning)
+
+def memo_subdept_code(memo) -> Optional[str]:
+    """The memo's first two characters when both are digits, else None."""
+    if pd.isna(memo):
+        return None
+    code = str(memo).strip()[:2]
+    return code if code.isdecimal() else None
+
+def build_spiff_pivot(adjustments: pd.DataFrame) -> SpiffPivot:
+    """Pivot the adjustments sheet into positive spiff totals per tech and subdept.
+
+    Positive spiffs whose memo has no department code in 20-49 are collected in invalid_memos;
+    the commission stage reports those of the service techs (see report_invalid_memos).
+    """
+    spiffs = pd.DataFrame({
+        'Technician': adjustments['Technician'],
+        'Subdept': adjustments['Memo'].map(memo_subdept_code),
+        'PCM Subdept': adjustments['Memo'].map(lambda memo: extract_dept_code(str(memo))),
+        'Amount': adjustments['Amount'],
+    })
+    spiffs['Department'] = spiffs['Subdept'].map(
+        lambda code: get_department_from_number(int(code)) if code else 'Unknown'
+    )
+    positive = spiffs[spiffs['Amount'] > 0]
+
+    invalid_memos = []
+    for idx, spiff in positive[positive['Department'] == 'Unknown'].iterrows():
+        memo = adjustments.at[idx, 'Memo']
+        if pd.isna(memo):
+            continue
+        if spiff['Subdept'] is None:
+            warning = f"Invalid memo format - must start with department number. Row {idx + 2}: {str(memo).strip()}"
+        else:
+            warning = f"Invalid department number in memo (must be 20-29, 30-39, or 40-49). Row {idx + 2}: {str(memo).strip()}"
+        invalid_memos.append({'Technician': spiff['Technician'], 'Warning': warning})
+
+    def pivot(frame: pd.DataFrame, column: str) -> pd.DataFrame:
+        frame = frame[frame[column].notna()]
+        if frame.empty:
+            return pd.DataFrame()
+        return ordered_group_sum(frame, ['Technician', column], 'Amount').unstack(fill_value=0.0)
+
+    return SpiffPivot(
+        positive=pivot(positive, 'Subdept'),
+        positive_by_department=pivot(positive[positive['Department'] != 'Unknown'], 'Department'),
+        pcm_positive=pivot(positive, 'PCM Subdept'),
+        invalid_memos=pd.DataFrame(invalid_memos, columns=['Technician', 'Warning']),
+    )
+
+@dataclass
+class WeekSnapshot:
+    """Parsed sheets of the combined workbook, loaded once and shared by every stage."""
+    jobs: pd.DataFrame
+    tech: pd.DataFrame
+    tgl: pd.DataFrame
+    invoices: pd.DataFrame
+    adjustments: pd.DataFrame
+    time_off: Optional[pd.DataFrame] = None  # Time off index from build_time_off_index
+    # Row positions of jobs sorted by invoice date and the sorted dates, built on first use
+    _invoice_index: Optional[Tuple[np.ndarray, np.ndarray]] = field(default=None, init=False, repr=False)
+    _spiff_pivot: Optional[SpiffPivot] = field(default=None, init=False, repr=False)
+    _valid_tgls: Optional[Dict[str, List[dict]]] = field(default=None, init=False, repr=False)
+
+    @classmethod
+    def from_workbook(cls, file_path: str, logger: logging.Logger) -> 'WeekSnapshot':
+        """Parse each snapshot sheet of the combined workbook exactly once, typed by its schema."""
+        sheets = {}
+        with pd.ExcelFile(file_path) as workbook:
+            for field, sheet_name in SNAPSHOT_SHEETS.items():
+                if sheet_name not in workbook.sheet_names:
+                    logger.warning(f"Sheet '{sheet_name}' not found in {file_path}, using an empty frame")
+                    sheets[field] = pd.DataFrame()
+                    continue
+                parsed = workbook.parse(sheet_name, **schema_read_options(sheet_name))
+                sheets[field] = apply_sheet_schema(parsed, sheet_name)
+                logger.debug(f"Loaded {len(sheets[field])} rows from sheet '{sheet_name}'")
+        return cls(**sheets)
+
+    def jobs_in_week(self, base_date: datetime) -> pd.DataFrame:
+        """Jobs invoiced in the week containing base_date, in their original row order.
+
+        Invoice dates are sorted once per snapshot and each week is sliced by binary search,
+        so the cost does not grow with the months covered by the Jobs export.
+        """
+        if self._invoice_index is None:
+            dates = self.jobs['Invoice Date'].to_numpy(dtype='datetime64[ns]')
+            order = np.argsort(dates, kind='stable')  # NaT sorts last
+            self._invoice_index = (order, dates[order])
+        order, sorted_dates = self._invoice_index
+        start, end = week_bounds(base_date)
+        lo, hi = np.searchsorted(sorted_dates, [start.to_datetime64(), end.to_datetime64()])
+        return self.jobs.iloc[np.sort(order[lo:hi])]
+
+    def spiff_pivot(self) -> SpiffPivot:
+        """Spiff totals per technician and subdepartment, built on first use."""
+        if self._spiff_pivot is None:
+            self._spiff_pivot = build_spiff_pivot(self.adjustments)
+        return self._spiff_pivot
+
+    def valid_tgls(self) -> Dict[str, List[dict]]:
+        """Valid TGLs by technician, built on first use."""
+        if self._valid_tgls is None:
+            self._valid_tgls = find_valid_tgls(self.tgl)
+        return self._valid_tgls
+
+    def unparsed_money(self) -> pd.DataFrame:
+        """Report of money values that could not be parsed at load, one row per value."""
+        rows = []
+        for field, sheet_name in SNAPSHOT_SHEETS.items():
+            for issue in getattr(self, field).attrs.get('unparsed_money', []):
+                rows.append({'Sheet': sheet_name, **issue})
+        return pd.DataFrame(rows, columns=['Sheet', 'Row', 'Column', 'Value'])
 
 def get_main_department_code(subdept_code: str) -> str:
     try:
@@ -476,14 +934,14 @@ def consolidate_negative_spiffs(tech_data: pd.DataFrame, spiffs_df: pd.DataFrame
             if tech_info.empty:
                 continue
                 
-            home_dept = get_tech_home_department(tech_info.iloc[0]['Technician Business Unit'])
+            home_dept = decode_business_unit(tech_info.iloc[0]['Technician Business Unit'])['Home Dept']
             badge_id = tech_info.iloc[0]['Badge ID']
             
             # Calculate total negative spiffs
             total_negative = 0
             for _, spiff in tech_spiffs.iterrows():
                 try:
-                    amount = float(str(spiff['Amount']).replace('$', '').replace(',', ''))
+                    amount = float(spiff['Amount'])
                     if amount < 0:
                         total_negative += amount
                 except (ValueError, TypeError):
@@ -501,7 +959,7 @@ def consolidate_negative_spiffs(tech_data: pd.DataFrame, spiffs_df: pd.DataFrame
             # Keep positive spiffs separate
             for _, spiff in tech_spiffs.iterrows():
                 try:
-                    amount = float(str(spiff['Amount']).replace('$', '').replace(',', ''))
+                    amount = float(spiff['Amount'])
                     if amount > 0:
                         positive_entries.append({
                             'Technician': tech_name,
@@ -551,8 +1009,12 @@ def process_pcm_entry(tech_data: pd.DataFrame, tech_name: str, subdept_code: str
 
 # Utility Functions
 def setup_logging(name='commission_calculator'):
-    """Configure logging with both file and console handlers."""
-    logger.setLevel(logging.DEBUG)
+    """Configure logging with both file and console handlers.
+
+    The file gets debug detail only when AUDIT_LOGGING is on.
+    """
+    file_level = logging.DEBUG if AUDIT_LOGGING else logging.INFO
+    logger.setLevel(file_level)
     
     # Clear any existing handlers
     logger.handlers = []
@@ -560,9 +1022,9 @@ def setup_logging(name='commission_calculator'):
     current_time = datetime.now().strftime('%Y%m%d_%H%M%S')
     log_filename = f'{name}_{current_time}.log'
     
-    # File handler - Debug level with detailed formatting
+    # File handler - Debug level (audit) or info level with detailed formatting
     fh = logging.FileHandler(log_filename)
-    fh.setLevel(logging.DEBUG)
+    fh.setLevel(file_level)
     file_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
     fh.setFormatter(file_formatter)
     
@@ -624,6 +1086,108 @@ def autofit_columns(worksheet):
         adjusted_width = (max_length + 2)
         worksheet.column_dimensions[column_letter].width = adjusted_width
 
+def format_payroll_sheet(worksheet, df: pd.DataFrame):
+    """Size columns, bold the header, right-align Amount as #,##0.00 and center the rest."""
+    for idx, col in enumerate(df.columns):
+        max_length = max(
+            df[col].astype(str).apply(len).max(),
+            len(str(col))
+        ) + 2
+        
+        col_letter = get_column_letter(idx + 1)
+        worksheet.column_dimensions[col_letter].width = max_length
+        
+        header_cell = worksheet[f"{col_letter}1"]
+        header_cell.font = Font(bold=True)
+        
+        # Special formatting for Amount column
+        if col == 'Amount':
+            for cell in worksheet[col_letter]:
+                cell.alignment = Alignment(horizontal='right')
+                if cell.row > 1:  # Skip header
+                    cell.number_format = '#,##0.00'
+        
+        # Center align other columns
+        else:
+            for cell in worksheet[col_letter]:
+                cell.alignment = Alignment(horizontal='center')
+
+# Worksheet styles of the output workbooks (see write_output_workbook)
+OUTPUT_STYLES = {
+    'autofit': lambda worksheet, df: autofit_columns(worksheet),
+    'payroll': format_payroll_sheet,
+}
+
+def write_output_workbook(path: str, sheets: Dict[str, pd.DataFrame], style: str) -> Tuple[float, int]:
+    """Write one output workbook, every sheet in the given style. Returns (seconds, bytes)."""
+    started = time.perf_counter()
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        for sheet_name, df in sheets.items():
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+            OUTPUT_STYLES[style](writer.sheets[sheet_name], df)
+    return time.perf_counter() - started, os.path.getsize(path)
+
+class OutputStage:
+    """The output workbooks of one run, serialized in a worker pool as soon as each is final.
+
+    Workbooks are written to a pending folder inside the output directory; commit()
+    moves them into the output directory only once every write has succeeded, so a
+    failed run leaves the previous outputs untouched.
+    """
+
+    def __init__(self, output_dir: str, logger: logging.Logger, workers: int = OUTPUT_WORKERS):
+        self.output_dir = output_dir
+        self.logger = logger
+        self.pending_dir = tempfile.mkdtemp(prefix='.pending-', dir=output_dir)
+        self.pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        self.writes: Dict[str, Future] = {}
+
+    def add(self, output_file: str, sheets: Dict[str, pd.DataFrame], style: str = 'autofit'):
+        """Queue a workbook for output_file (only its file name is used) from final frames."""
+        self.add_writer(output_file, write_output_workbook, sheets, style)
+
+    def add_writer(self, output_file: str, write, *args):
+        """Queue write(path, *args) for output_file; write returns (seconds, bytes)."""
+        file_name = os.path.basename(output_file)
+        path = os.path.join(self.pending_dir, file_name)
+        if self.pool is not None:
+            self.writes[file_name] = self.pool.submit(write, path, *args)
+            return
+        future = Future()
+        try:
+            future.set_result(write(path, *args))
+        except Exception as e:
+            future.set_exception(e)
+        self.writes[file_name] = future
+
+    def commit(self):
+        """Wait for every write, then move the workbooks into the output directory and report them."""
+        try:
+            results, failed = {}, []
+            for file_name, future in self.writes.items():
+                try:
+                    results[file_name] = future.result()
+                except Exception as e:
+                    self.logger.error(f"Error writing {file_name}: {str(e)}")
+                    failed.append(file_name)
+            if failed:
+                raise RuntimeError(f"Could not write {', '.join(failed)}; no output files were replaced")
+            for file_name in results:
+                os.replace(os.path.join(self.pending_dir, file_name), os.path.join(self.output_dir, file_name))
+        finally:
+            self.close()
+
+        self.logger.info(f"Saved {len(results)} output files to {self.output_dir}:")
+        for file_name, (seconds, size) in results.items():
+            self.logger.info(f"  {file_name}: {size / 1024:,.1f} KB written in {seconds:.2f}s")
+
+    def close(self):
+        """Stop the workers and drop any workbooks that were not committed."""
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
+        shutil.rmtree(self.pending_dir, ignore_errors=True)
+
 def format_currency(amount):
     """Format number as currency string."""
     try:
@@ -671,6 +1235,49 @@ def get_department_from_number(dept_num):
         return 'Electric'
     return 'Unknown'
 
+# Decoded fields of each business unit seen this run, see decode_business_unit
+BUSINESS_UNIT_FIELDS = ['Subdept', 'Department', 'Tech Type', 'Pay Code', 'Home Dept', 'Dept Code',
+                        'GP Subdept', 'GP Dept Code']
+_business_unit_decodes: Dict[object, dict] = {}
+
+def decode_business_unit(business_unit) -> dict:
+    """Decode a business unit once: subdept code, main department, tech type, pay code,
+    7-digit home department and 7-digit subdepartment code (None if not in DEPARTMENT_CODES).
+
+    The installer GP entries read the subdepartment differently, as the first two-digit run
+    anywhere in the unit: 'GP Subdept' (None if there is none) and its 'GP Dept Code'."""
+    key = None if pd.isna(business_unit) else business_unit
+    if key not in _business_unit_decodes:
+        subdept = extract_subdepartment_code(business_unit)
+        gp_codes = re.findall(r'\d{2}', str(business_unit))
+        gp_subdept = gp_codes[0] if gp_codes else None
+        _business_unit_decodes[key] = {
+            'Subdept': subdept,
+            'Department': get_department_from_number(extract_department_number(str(business_unit))),
+            'Tech Type': determine_tech_type(business_unit),
+            'Pay Code': determine_pay_code(business_unit),
+            'Home Dept': get_tech_home_department(business_unit),
+            'Dept Code': DEPARTMENT_CODES.get(subdept, {}).get('code'),
+            'GP Subdept': gp_subdept,
+            'GP Dept Code': DEPARTMENT_CODES.get(gp_subdept, {}).get('code'),
+        }
+    return _business_unit_decodes[key]
+
+def decode_business_units(values: pd.Series) -> pd.DataFrame:
+    """Decoded fields for a business unit column, one row per value with the same index.
+
+    Each distinct unit is decoded once and the rows are joined on their factorized code.
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    table = pd.DataFrame([decode_business_unit(unit) for unit in uniques], columns=BUSINESS_UNIT_FIELDS)
+    decoded = table.take(codes)
+    decoded.index = values.index
+    return decoded
+
+def business_unit_field(values: pd.Series, field: str) -> pd.Series:
+    """One decoded field (see BUSINESS_UNIT_FIELDS) for a business unit column."""
+    return decode_business_units(values)[field]
+
 def extract_dept_code(memo: str) -> Optional[str]:
     """Extract department code from memo string."""
     if not memo:
@@ -686,240 +1293,174 @@ def format_threshold_scale(thresholds):
             f"4%: ${thresholds[2]:,.0f} | "
             f"5%: ${thresholds[3]:,.0f}")
 
-def extract_department_range(business_unit, logger):
-    """Extract department range from business unit."""
-    try:
-        unit_number = int(''.join(filter(str.isdigit, business_unit)))
-        base = (unit_number // 10) * 10
-        if 20 <= base <= 20:
-            return range(20, 30)
-        elif 30 <= base <= 30:
-            return range(30, 40)
-        elif 40 <= base <= 40:
-            return range(40, 50)
-        return range(0, 0)
-    except (ValueError, TypeError) as e:
-        logger.warning(f"Could not extract department range from business unit: {business_unit}")
-        return range(0, 0)
-
-
-def is_same_department(source_unit, target_unit, logger=None):
-    """Check if two business units are in the same department."""
-    source_range = extract_department_range(source_unit, logger)
-    target_range = extract_department_range(target_unit, logger)
-    
-    return (len(source_range) > 0 and 
-            len(target_range) > 0 and 
-            source_range.start == target_range.start)
-
-
-def get_valid_tgls(file_path: str, tech_name: str) -> List[dict]:
-    """Get valid TGLs for a technician."""
-    try:
-        tgl_df = pd.read_excel(file_path, sheet_name='Sheet1_TGL')
-        logger.debug(f"Processing TGLs for {tech_name} from Sheet1_TGL")
-        logger.debug(f"Available columns: {tgl_df.columns.tolist()}")
-        
-        valid_tgls = []
-        tech_tgls = tgl_df[
-            (tgl_df['Lead Generated By'] == tech_name) & 
-            (tgl_df['Status'] == 'Completed')
-        ]
-        
-        for _, tgl in tech_tgls.iterrows():
-            source_unit = str(tgl['Business Unit'])
-            target_unit = str(tgl['Lead Generated from Business Unit'])
-            
-            if is_same_department(source_unit, target_unit, logger):
-                valid_tgls.append({
-                    'job_number': tgl.get('Job #', 'N/A'),
-                    'status': tgl['Status'],
-                    'business_unit': source_unit,
-                    'target_unit': target_unit,
-                    'created_date': tgl['Created Date']
-                })
-                logger.debug(f"Valid TGL found - Job #: {tgl.get('Job #', 'N/A')}, "
-                           f"From: {source_unit} To: {target_unit}")
-        
-        return valid_tgls
-        
-    except Exception as e:
-        logger.error(f"Error processing TGL data for {tech_name}: {str(e)}")
-        return []
+def department_range_start(business_units: pd.Series) -> pd.Series:
+    """Start of the department range (20, 30 or 40) of each business unit, NaN for any other.
+
+    All digits of the unit are read as one number and floored to its tens, so
+    '21 - HVAC INSTALL' -> 20 while '210 - X' falls outside every range.
+    """
+    digits = business_units.astype(str).str.replace(r'\D', '', regex=True)
+    for unit in business_units[digits == ''].astype(str).unique():
+        logger.warning(f"Could not extract department range from business unit: {unit}")
+    base = (pd.to_numeric(digits, errors='coerce') // 10) * 10
+    return base.where(base.isin([20, 30, 40]))
 
-def get_subdepartment_spiffs(file_path: str, tech_name: str) -> dict[str, float]:
+def find_valid_tgls(tgl_df: pd.DataFrame) -> Dict[str, List[dict]]:
+    """Valid TGLs of every technician from Sheet1_TGL, in one pass over the sheet.
+
+    A TGL is valid when it is Completed and its business unit and the unit the
+    lead was generated from fall in the same department range.
+    """
+    required = ['Lead Generated By', 'Status', 'Business Unit', 'Lead Generated from Business Unit', 'Created Date']
+    missing = [col for col in required if col not in tgl_df.columns]
+    if missing:
+        logger.warning(f"Sheet1_TGL is missing {missing}, no TGLs counted")
+        return {}
+
+    completed = tgl_df[tgl_df['Status'] == 'Completed']
+    source_range = department_range_start(completed['Business Unit'])
+    target_range = department_range_start(completed['Lead Generated from Business Unit'])
+    valid = completed[source_range.notna() & (source_range == target_range)]
+
+    tgls = pd.DataFrame({
+        'job_number': valid['Job #'] if 'Job #' in valid.columns else 'N/A',
+        'status': valid['Status'],
+        'business_unit': valid['Business Unit'].astype(str),
+        'target_unit': valid['Lead Generated from Business Unit'].astype(str),
+        'created_date': valid['Created Date'],
+    })
+    valid_tgls = {
+        tech_name: group.to_dict('records')
+        for tech_name, group in tgls.groupby(valid['Lead Generated By'], sort=False)
+    }
+    if logger.isEnabledFor(logging.DEBUG):
+        for tech_name, tech_tgls in valid_tgls.items():
+            for tgl in tech_tgls:
+                logger.debug(f"Valid TGL found for {tech_name} - Job #: {tgl['job_number']}, "
+                             f"From: {tgl['business_unit']} To: {tgl['target_unit']}")
+    return valid_tgls
+
+def get_subdepartment_spiffs(spiffs: SpiffPivot, tech_name: str) -> dict[str, float]:
     """
     Get spiffs broken down by subdepartment for display purposes only.
     """
-    try:
-        spiffs_df = pd.read_excel(file_path, sheet_name='Direct Payroll Adjustments')
-        tech_spiffs = spiffs_df[spiffs_df['Technician'] == tech_name]
-        
-        # Initialize subdepartment totals
-        subdepartment_spiffs = {
-            code: 0 for code in ['20', '21', '22', '24', '25', '27', 
-                               '30', '31', '33', '34', 
-                               '40', '41', '42']
-        }
-        
-        for _, spiff in tech_spiffs.iterrows():
-            try:
-                if pd.isna(spiff['Amount']) or pd.isna(spiff['Memo']):
-                    continue
-                    
-                amount = float(str(spiff['Amount']).replace('$', '').replace(',', '').strip())
-                if amount <= 0:  # Only filter out negative amounts
-                    continue
-                    
-                memo = str(spiff['Memo']).strip()
-                
-                # Extract subdepartment code
-                if not memo[:2].isdigit():
-                    continue
-                    
-                subdept = memo[:2]
-                if subdept in subdepartment_spiffs:
-                    subdepartment_spiffs[subdept] += amount
-                    
-            except ValueError:
-                continue
-        
-        return subdepartment_spiffs
-        
-    except Exception as e:
-        logger.error(f"Error getting subdepartment spiffs for {tech_name}: {str(e)}")
-        return {code: 0 for code in ['20', '21', '22', '24', '25', '27', 
-                                   '30', '31', '33', '34', 
-                                   '40', '41', '42']}
+    positive = spiffs.positive_for(tech_name)
+    return {
+        code: positive.get(code, 0) for code in ['20', '21', '22', '24', '25', '27', 
+                                               '30', '31', '33', '34', 
+                                               '40', '41', '42']
+    }
 
-def get_spiffs_total(file_path: str, tech_name: str) -> tuple[float, dict[str, float]]:
+def get_spiffs_total(spiffs: SpiffPivot, tech_name: str) -> tuple[float, dict[str, float]]:
+    """Positive spiffs of a technician by main department, and their total."""
+    by_department = spiffs.positive_by_department_for(tech_name)
+    department_spiffs = {dept: by_department.get(dept, 0) for dept in ['HVAC', 'Plumbing', 'Electric']}
+    spiffs_total = sum(department_spiffs.values())
+    return spiffs_total, department_spiffs
+
+def parse_time_off_week_header(header, year: int) -> Optional[Tuple[datetime, int]]:
+    """Parse a week header such as "March 4th - March 8th" into its start date and day count."""
+    match = re.match(r'^\s*([A-Za-z]+)\s+(\d{1,2})(?:st|nd|rd|th)?\s*-\s*([A-Za-z]+)\s+(\d{1,2})(?:st|nd|rd|th)?\s*$',
+                     str(header))
+    if not match:
+        return None
     try:
-        spiffs_df = pd.read_excel(file_path, sheet_name='Direct Payroll Adjustments')
-        tech_spiffs = spiffs_df[spiffs_df['Technician'] == tech_name]
-        
-        department_spiffs = {
-            'HVAC': 0,
-            'Plumbing': 0,
-            'Electric': 0
-        }
-        
-        for idx, spiff in tech_spiffs.iterrows():
-            try:
-                # Skip if amount is missing
-                if pd.isna(spiff['Amount']):
-                    continue
-                    
-                # Convert amount to float
-                amount = float(str(spiff['Amount']).replace('$', '').replace(',', '').strip())
-                
-                # Skip negative amounts and zero
-                if amount <= 0:
-                    continue
-                    
-                # Skip if memo is missing
-                if pd.isna(spiff['Memo']):
-                    continue
-                    
-                memo = str(spiff['Memo']).strip()
-                
-                # Skip if memo doesn't start with department number
-                if not memo[:2].isdigit():
-                    logger.warning(f"Invalid memo format - must start with department number. Row {idx + 2}: {memo}")
-                    continue
-                
-                # Get department number and validate
-                dept_num = int(memo[:2])
-                if not (20 <= dept_num <= 29 or 30 <= dept_num <= 39 or 40 <= dept_num <= 49):
-                    logger.warning(f"Invalid department number in memo (must be 20-29, 30-39, or 40-49). Row {idx + 2}: {memo}")
-                    continue
-                
-                # Add amount to appropriate department total
-                if 20 <= dept_num <= 29:
-                    department_spiffs['HVAC'] += amount
-                elif 30 <= dept_num <= 39:
-                    department_spiffs['Plumbing'] += amount
-                elif 40 <= dept_num <= 49:
-                    department_spiffs['Electric'] += amount
-                    
-                logger.debug(f"Added positive spiff: ${amount:,.2f} to dept {dept_num}")
-                
-            except ValueError as e:
-                logger.warning(f"Error processing spiff entry in row {idx + 2}: {str(e)}")
-                continue
-        
-        spiffs_total = sum(department_spiffs.values())
-        return spiffs_total, department_spiffs
-        
-    except Exception as e:
-        logger.error(f"Error processing spiffs data for {tech_name}: {str(e)}")
-        raise
+        start_month, start_day, end_month, end_day = match.groups()
+        start = datetime.strptime(f"{start_month} {start_day} {year}", '%B %d %Y')
+        end = datetime.strptime(f"{end_month} {end_day} {year}", '%B %d %Y')
+    except ValueError:
+        return None
+    if end < start:  # Week running into the next year
+        end = end.replace(year=year + 1)
+    return start, (end - start).days + 1
+
+def build_time_off_index(sheets: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Build a (technician, sheet row) x date matrix of time off markers from the year sheets.
+
+    Each year sheet (named like '2024') has week headers such as "March 4th - March 8th"
+    in one of its first two rows, technician names in the first column and one
+    column per weekday. Cells hold the normalized marker ('x', 'r', 'v') or NaN.
+    A technician listed on several rows keeps one index row per sheet row, so
+    get_excused_hours can pick the row that counts.
+    """
+    markers = []
+    for sheet_name, df in sheets.items():
+        if not re.fullmatch(r'\d{4}', str(sheet_name).strip()) or len(df) < 3:
+            continue
+        year = int(str(sheet_name).strip())
 
-def get_excused_hours(file_path: str, base_date: datetime, sheet_name: str = '2024') -> Dict[str, int]:
-    """Get excused hours from time off sheet."""
+        names = df.iloc[2:, 0].str.strip()
+        rows = df.iloc[2:][names.notna() & (names != '')]
+        names = names[rows.index]
+
+        for row_idx in [0, 1]:
+            for col_idx, header in df.iloc[row_idx].items():
+                week = parse_time_off_week_header(header, year) if isinstance(header, str) else None
+                if week is None:
+                    continue
+                start, days = week
+                block = rows.iloc[:, col_idx:col_idx + min(days, 5)]
+                block = block.apply(lambda col: col.str.strip().str.lower())
+                block.index = pd.MultiIndex.from_arrays([names.values, rows.index], names=['Technician', 'Row'])
+                block.columns = [start + timedelta(days=k) for k in range(block.shape[1])]
+                block = block.where(block.isin(TIME_OFF_MARKERS))
+                markers.append(block.stack())
+
+    if not markers:
+        return pd.DataFrame()
+    long_form = pd.concat(markers)
+    long_form = long_form.groupby(level=[0, 1, 2]).first()
+    index = long_form.unstack()
+    return index.reindex(columns=sorted(index.columns))
+
+def load_time_off_index(file_path: str) -> pd.DataFrame:
+    """Load the time off index for a workbook, cached by its content between runs."""
+    def build():
+        sheets = read_excel_typed(file_path, sheet_name=None, schema='Time Off')
+        return build_time_off_index(sheets)
+    return load_cached(file_path, f"time-off-index|by-row|{TIME_OFF_MARKERS!r}", build)
+
+def get_excused_hours(file_path: str, base_date: datetime,
+                      time_off_index: Optional[pd.DataFrame] = None) -> Dict[str, int]:
+    """Get excused hours for the Monday-Friday of base_date's week from the time off index."""
     try:
-        df = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
-        
+        if time_off_index is None:
+            time_off_index = load_time_off_index(file_path)
+
         start_of_week = base_date - timedelta(days=base_date.weekday())
         end_of_week = start_of_week + timedelta(days=4)
-        
-        def format_date(date):
-            day = date.day
-            if 4 <= day <= 20 or 24 <= day <= 30:
-                suffix = "th"
-            else:
-                suffix = ["st", "nd", "rd"][day % 10 - 1]
-            return f"{date.strftime('%B')} {day}{suffix}"
-        
-        target_week = f"{format_date(start_of_week)} - {format_date(end_of_week)}"
-        logger.debug(f"Looking for week range: {target_week}")
-        
-        start_col = None
-        for row_idx in [0, 1]:
-            for col_idx, header in enumerate(df.iloc[row_idx]):
-                if isinstance(header, str) and target_week.strip() == header.strip():
-                    start_col = col_idx
-                    logger.debug(f"Found target week in row {row_idx}, column {col_idx}")
-                    break
-            if start_col is not None:
-                break
-        
-        if start_col is None:
-            logger.warning(f"Week range '{target_week}' not found in time off sheet")
+        logger.debug(f"Looking for time off from {start_of_week.strftime('%m/%d/%y')} to {end_of_week.strftime('%m/%d/%y')}")
+
+        week = time_off_index.loc[:, pd.Timestamp(start_of_week.date()):pd.Timestamp(end_of_week.date())] \
+            if not time_off_index.empty else time_off_index
+        if week.shape[1] == 0:
+            logger.warning(f"Week of {start_of_week.strftime('%m/%d/%y')} not found in time off sheets")
             return {}
-        
-        week_columns = list(range(start_col, start_col + 5))
-        hours_summary = {}
-        
-        for index in range(2, len(df)):
-            row = df.iloc[index]
-            technician_name = row[0]
-            
-            if pd.isna(technician_name) or str(technician_name).strip() == '':
-                continue
-            
-            technician_name = str(technician_name).strip()
-            total_hours = 0
-            
-            for col in week_columns:
-                try:
-                    cell_value = str(row[col]).strip().lower()
-                    if cell_value in ['x', 'r', 'v']:
-                        total_hours += 8
-                        logger.debug(f"Found time off marker '{cell_value}' for {technician_name} in column {col}")
-                except Exception as e:
-                    logger.warning(f"Error processing cell for {technician_name} in column {col}: {str(e)}")
-                    continue
-            
-            if total_hours > 0:
-                hours_summary[technician_name] = total_hours
-                logger.debug(f"Found {total_hours} excused hours for {technician_name}")
-        
+
+        # A technician on several rows gets the last row with time off that week, as in the sheet scan
+        days_off = week.notna().sum(axis=1)
+        days_off = days_off[days_off > 0].groupby(level='Technician').last()
+        hours_summary = {name: int(days) * TIME_OFF_HOURS_PER_DAY for name, days in days_off.items()}
+        logger.debug(f"Found excused hours for {len(hours_summary)} technicians")
         return hours_summary
         
     except Exception as e:
         logger.error(f"Error analyzing time off data: {str(e)}")
         return {}
 
+def log_job_audit(job: pd.Series, details: List[Tuple[str, object]]):
+    """Narrate one job at debug level: invoice, customer and business unit, then the given details."""
+    logger.debug(f"Invoice #{job.get('Invoice #', 'N/A')} - {job['Invoice Date'].strftime('%m/%d/%y')}")
+    logger.debug(f"Customer: {job.get('Customer Name', 'Unknown')}")
+    logger.debug(f"Business Unit: {job.get('Business Unit', 'Unknown')}")
+    for label, value in details:
+        logger.debug(f"{label}: {value}")
+
+def log_jobs_not_shown(narrated: int):
+    """Note the jobs left out of a section capped at AUDIT_JOBS_PER_TECH."""
+    if narrated > AUDIT_JOBS_PER_TECH:
+        logger.debug(f"... {narrated - AUDIT_JOBS_PER_TECH} more jobs not shown")
+
 def calculate_box_metrics(data: pd.DataFrame, tech_name: str, base_date: datetime) -> Tuple[float, float, float, Dict[str, Dict[str, float]]]:
     """Calculate Box A (CJR), Box B (TSIS), and Box C (Total) metrics with subdepartment breakdowns."""
     subdept_breakdown = {
@@ -927,122 +1468,135 @@ def calculate_box_metrics(data: pd.DataFrame, tech_name: str, base_date: datetim
         'sales': {code: 0.0 for code in SUBDEPARTMENT_MAP.keys()},
         'total': {code: 0.0 for code in SUBDEPARTMENT_MAP.keys()}
     }
+    # Revenue of codes missing from SUBDEPARTMENT_MAP, reported once per code below
+    unmapped = defaultdict(float)
+    # Per-job narration is only built for a verbose audit, and capped per section
+    audit = logger.isEnabledFor(logging.DEBUG)
 
     # Calculate week range
     start_of_week = base_date - timedelta(days=base_date.weekday())
     end_of_week = start_of_week + timedelta(days=6)
     
-    logger.debug(f"\nCalculating metrics for {tech_name} for week {start_of_week.strftime('%Y-%m-%d')} to {end_of_week.strftime('%Y-%m-%d')}")
-
-    # Ensure datetime format
-    if not pd.api.types.is_datetime64_any_dtype(data['Invoice Date']):
-        data['Invoice Date'] = pd.to_datetime(data['Invoice Date'])
+    if audit:
+        logger.debug(f"\nCalculating metrics for {tech_name} for week {start_of_week.strftime('%Y-%m-%d')} to {end_of_week.strftime('%Y-%m-%d')}")
 
     # Get all jobs related to the technician in any capacity (primary or sold by)
     relevant_jobs = data[(data['Primary Technician'] == tech_name) | (data['Sold By'] == tech_name)]
     total_relevant_jobs = len(relevant_jobs)
     
-    logger.debug(f"\nFound {total_relevant_jobs} total jobs related to {tech_name}")
-    logger.debug("="*80)
-    
-    # Filter and log primary jobs within date range
+    # Filter primary jobs within date range
     primary_jobs = relevant_jobs[
         (relevant_jobs['Primary Technician'] == tech_name) &
-        (relevant_jobs['Invoice Date'].dt.date >= start_of_week.date()) &
-        (relevant_jobs['Invoice Date'].dt.date <= end_of_week.date())
+        in_week_mask(relevant_jobs['Invoice Date'], base_date)
     ]
     
-    logger.debug("\nCOMPLETED JOBS (Box A - CJR):")
-    logger.debug("-" * 50)
+    if audit:
+        logger.debug(f"\nFound {total_relevant_jobs} total jobs related to {tech_name}")
+        logger.debug("="*80)
+        logger.debug("\nCOMPLETED JOBS (Box A - CJR):")
+        logger.debug("-" * 50)
     box_a = 0.0
+    narrated = 0
     for _, job in primary_jobs.iterrows():
         if job.get('Opportunity', False):  # Only include opportunity jobs
             revenue = job['Jobs Total Revenue'] or 0
             box_a += revenue
             
             # Calculate subdepartment breakdowns for completed jobs
-            subdept = extract_subdepartment_code(job.get('Business Unit', ''))
-            subdept_breakdown['completed'][subdept] += revenue
-            subdept_breakdown['total'][subdept] += revenue
+            subdept = decode_business_unit(job.get('Business Unit', ''))['Subdept']
+            if subdept in SUBDEPARTMENT_MAP:
+                subdept_breakdown['completed'][subdept] += revenue
+                subdept_breakdown['total'][subdept] += revenue
+            else:
+                unmapped[subdept] += revenue
             
-            # Log each completed job's details
-            logger.debug(f"Invoice #{job.get('Invoice #', 'N/A')} - {job['Invoice Date'].strftime('%m/%d/%y')}")
-            logger.debug(f"Customer: {job.get('Customer Name', 'Unknown')}")
-            logger.debug(f"Business Unit: {job.get('Business Unit', 'Unknown')}")
-            logger.debug(f"Revenue: ${revenue:,.2f}")
-            if pd.notna(job.get('GP')):
-                logger.debug(f"GP: ${job.get('GP', 0):,.2f}")
-            logger.debug(f"Opportunity: {'Yes' if job.get('Opportunity', False) else 'No'}")
-            logger.debug("-" * 30)
-    
-    logger.debug(f"\nTotal Box A (CJR): ${box_a:,.2f}")
-    logger.debug("="*80)
-    
-    # Filter and log sold jobs within date range
+            narrated += 1
+            if audit and narrated <= AUDIT_JOBS_PER_TECH:
+                details = [('Revenue', f"${revenue:,.2f}")]
+                if pd.notna(job.get('GP')):
+                    details.append(('GP', f"${job.get('GP', 0):,.2f}"))
+                details.append(('Opportunity', 'Yes'))
+                log_job_audit(job, details)
+                logger.debug("-" * 30)
+    
+    if audit:
+        log_jobs_not_shown(narrated)
+        logger.debug(f"\nTotal Box A (CJR): ${box_a:,.2f}")
+        logger.debug("="*80)
+    
+    # Filter sold jobs within date range
     sold_jobs = relevant_jobs[
         (relevant_jobs['Sold By'] == tech_name) &
         (relevant_jobs['Primary Technician'] != tech_name) &
-        (relevant_jobs['Invoice Date'].dt.date >= start_of_week.date()) &
-        (relevant_jobs['Invoice Date'].dt.date <= end_of_week.date())
+        in_week_mask(relevant_jobs['Invoice Date'], base_date)
     ]
     
-    logger.debug("\nSOLD JOBS (Box B - TSIS):")
-    logger.debug("-" * 50)
+    if audit:
+        logger.debug("\nSOLD JOBS (Box B - TSIS):")
+        logger.debug("-" * 50)
     box_b = 0.0
+    narrated = 0
     for _, job in sold_jobs.iterrows():
         revenue = job['Jobs Total Revenue'] or 0
         box_b += revenue
         
         # Calculate subdepartment breakdowns for sold jobs
-        subdept = extract_subdepartment_code(job.get('Business Unit', ''))
-        subdept_breakdown['sales'][subdept] += revenue
-        subdept_breakdown['total'][subdept] += revenue
-        
-        # Log each sold job's details
-        logger.debug(f"Invoice #{job.get('Invoice #', 'N/A')} - {job['Invoice Date'].strftime('%m/%d/%y')}")
-        logger.debug(f"Customer: {job.get('Customer Name', 'Unknown')}")
-        logger.debug(f"Business Unit: {job.get('Business Unit', 'Unknown')}")
-        logger.debug(f"Revenue: ${revenue:,.2f}")
-        logger.debug(f"Primary Tech: {job.get('Primary Technician', 'Unknown')}")
-        if pd.notna(job.get('GP')):
-            logger.debug(f"GP: ${job.get('GP', 0):,.2f}")
-        logger.debug(f"Opportunity: {'Yes' if job.get('Opportunity', False) else 'No'}")
-        logger.debug("-" * 30)
-    
-    logger.debug(f"\nTotal Box B (TSIS): ${box_b:,.2f}")
-    logger.debug("="*80)
+        subdept = decode_business_unit(job.get('Business Unit', ''))['Subdept']
+        if subdept in SUBDEPARTMENT_MAP:
+            subdept_breakdown['sales'][subdept] += revenue
+            subdept_breakdown['total'][subdept] += revenue
+        else:
+            unmapped[subdept] += revenue
+        
+        narrated += 1
+        if audit and narrated <= AUDIT_JOBS_PER_TECH:
+            details = [('Revenue', f"${revenue:,.2f}"),
+                       ('Primary Tech', job.get('Primary Technician', 'Unknown'))]
+            if pd.notna(job.get('GP')):
+                details.append(('GP', f"${job.get('GP', 0):,.2f}"))
+            details.append(('Opportunity', 'Yes' if job.get('Opportunity', False) else 'No'))
+            log_job_audit(job, details)
+            logger.debug("-" * 30)
+    
+    for code, total in unmapped.items():
+        logger.warning(f"{tech_name}: subdepartment {code} is not in SUBDEPARTMENT_MAP; "
+                       f"${total:,.2f} counts in Box A/B but is left out of the subdepartment breakdown")
 
     included_count = len(primary_jobs) + len(sold_jobs)
     skipped_count = total_relevant_jobs - included_count
     box_c = box_a + box_b
     
-    logger.debug("\nSUMMARY:")
-    logger.debug(f"Total Jobs Found: {total_relevant_jobs}")
-    logger.debug(f"Jobs Included: {included_count}")
-    logger.debug(f"Jobs Skipped: {skipped_count}")
-    logger.debug(f"Box A (CJR): ${box_a:,.2f}")
-    logger.debug(f"Box B (TSIS): ${box_b:,.2f}")
-    logger.debug(f"Box C (Total): ${box_c:,.2f}")
+    if audit:
+        log_jobs_not_shown(narrated)
+        logger.debug(f"\nTotal Box B (TSIS): ${box_b:,.2f}")
+        logger.debug("="*80)
+        logger.debug("\nSUMMARY:")
+        logger.debug(f"Total Jobs Found: {total_relevant_jobs}")
+        logger.debug(f"Jobs Included: {included_count}")
+        logger.debug(f"Jobs Skipped: {skipped_count}")
+        logger.debug(f"Box A (CJR): ${box_a:,.2f}")
+        logger.debug(f"Box B (TSIS): ${box_b:,.2f}")
+        logger.debug(f"Box C (Total): ${box_c:,.2f}")
     
     # Log summary of skipped jobs if any
     if skipped_count > 0:
         logger.info(f"Note: {skipped_count} jobs were skipped because they did not fall within the selected week")
-        skipped_jobs = relevant_jobs[
-            ~(
-                ((relevant_jobs['Primary Technician'] == tech_name) |
-                (relevant_jobs['Sold By'] == tech_name)) &
-                (relevant_jobs['Invoice Date'].dt.date >= start_of_week.date()) &
-                (relevant_jobs['Invoice Date'].dt.date <= end_of_week.date())
-            )
-        ]
-        for _, job in skipped_jobs.iterrows():
-            logger.debug(f"\nSkipped Job Details:")
-            logger.debug(f"Invoice #{job.get('Invoice #', 'N/A')} - {job['Invoice Date'].strftime('%m/%d/%y')}")
-            logger.debug(f"Customer: {job.get('Customer Name', 'Unknown')}")
-            logger.debug(f"Business Unit: {job.get('Business Unit', 'Unknown')}")
-            logger.debug(f"Revenue: ${job.get('Jobs Total Revenue', 0):,.2f}")
-            logger.debug(f"Primary Tech: {job.get('Primary Technician', 'Unknown')}")
-            logger.debug(f"Sold By: {job.get('Sold By', 'Unknown')}")
+        if audit:
+            skipped_jobs = relevant_jobs[
+                ~(
+                    ((relevant_jobs['Primary Technician'] == tech_name) |
+                    (relevant_jobs['Sold By'] == tech_name)) &
+                    in_week_mask(relevant_jobs['Invoice Date'], base_date)
+                )
+            ]
+            for _, job in islice(skipped_jobs.iterrows(), AUDIT_JOBS_PER_TECH):
+                logger.debug(f"\nSkipped Job Details:")
+                log_job_audit(job, [
+                    ('Revenue', f"${job.get('Jobs Total Revenue', 0):,.2f}"),
+                    ('Primary Tech', job.get('Primary Technician', 'Unknown')),
+                    ('Sold By', job.get('Sold By', 'Unknown')),
+                ])
+            log_jobs_not_shown(len(skipped_jobs))
         
     return box_a, box_b, box_c, subdept_breakdown
 
@@ -1075,37 +1629,60 @@ def calculate_percentages(box_a: float, box_c: float) -> Tuple[int, int]:
     
     return int(scp), int(icp)
 
+def calculate_average_tickets(data: pd.DataFrame, box_c: Dict[str, float]) -> Dict[str, Dict[str, float]]:
+    """Average tickets of every technician in box_c from one grouped pass over the opportunity jobs.
+
+    data holds only the jobs invoiced in the week. The overall average is the tech's
+    Box C over their opportunity count; the HVAC, Plumbing and Electric averages are
+    the revenue of the tech's opportunity jobs in that department over their count.
+    """
+    opportunity_jobs = data[data['Opportunity'] == True]
+    jobs = pd.DataFrame({
+        'tech': opportunity_jobs['Primary Technician'],
+        'department': business_unit_field(opportunity_jobs['Business Unit'], 'Department'),
+        'revenue': opportunity_jobs['Jobs Total Revenue'].fillna(0.0),
+    })
+    dept_revenue = ordered_group_sum(jobs, ['tech', 'department'], 'revenue')
+    dept_count = jobs.groupby(['tech', 'department']).size()
+    opportunity_count = jobs.groupby('tech').size()
+
+    avg_tickets = {}
+    for tech_name, tech_box_c in box_c.items():
+        count = int(opportunity_count.get(tech_name, 0))
+        tech_tickets = {'overall': round(tech_box_c / count, 2) if count > 0 else 0}
+        for dept in ['HVAC', 'Plumbing', 'Electric']:
+            dept_jobs = int(dept_count.get((tech_name, dept), 0))
+            tech_tickets[dept] = round(dept_revenue[(tech_name, dept)] / dept_jobs, 2) if dept_jobs > 0 else 0
+        avg_tickets[tech_name] = tech_tickets
+    return avg_tickets
+
 def calculate_average_ticket_value(data: pd.DataFrame, tech_name: str, box_a: float, box_b: float, base_date: datetime, logger: logging.Logger) -> Dict[str, float]:
     """Calculate average ticket value using total revenue divided by opportunity count."""
-    avg_tickets = {'overall': 0.0}
-    
-    # Calculate week range
-    start_of_week = base_date - timedelta(days=base_date.weekday())
-    end_of_week = start_of_week + timedelta(days=6)
-    
-    logger.debug(f"\nCALCULATING AVERAGE TICKET VALUE FOR {tech_name.upper()}")
-    logger.debug("=" * 80)
-    logger.debug(f"Week Range: {start_of_week.strftime('%m/%d/%y')} to {end_of_week.strftime('%m/%d/%y')}")
-    
-    if not pd.api.types.is_datetime64_any_dtype(data['Invoice Date']):
-        data['Invoice Date'] = pd.to_datetime(data['Invoice Date'])
-
     # Get completed jobs within date range
     completed_jobs = data[
         (data['Primary Technician'] == tech_name) &
-        (data['Invoice Date'].dt.date >= start_of_week.date()) &
-        (data['Invoice Date'].dt.date <= end_of_week.date())
+        in_week_mask(data['Invoice Date'], base_date)
     ]
     
-    # Get count of opportunity jobs and log details
-    opportunity_jobs = completed_jobs[completed_jobs['Opportunity'] == True]
-    opportunity_count = len(opportunity_jobs)
+    total_revenue = box_a + box_b
+    avg_tickets = calculate_average_tickets(completed_jobs, {tech_name: total_revenue})[tech_name]
+    avg_ticket = avg_tickets['overall']
     
+    # The breakdown below only narrates the result for a verbose audit
+    if not logger.isEnabledFor(logging.DEBUG):
+        return avg_tickets
+
+    start_of_week = base_date - timedelta(days=base_date.weekday())
+    end_of_week = start_of_week + timedelta(days=6)
+    logger.debug(f"\nCALCULATING AVERAGE TICKET VALUE FOR {tech_name.upper()}")
+    logger.debug("=" * 80)
+    logger.debug(f"Week Range: {start_of_week.strftime('%m/%d/%y')} to {end_of_week.strftime('%m/%d/%y')}")
     logger.debug("\nOPPORTUNITY JOBS BREAKDOWN:")
     logger.debug("-" * 50)
     
-    total_revenue = box_a + box_b
-    
+    opportunity_jobs = completed_jobs[completed_jobs['Opportunity'] == True]
+    opportunity_count = len(opportunity_jobs)
+
     # Track department totals
     dept_totals = {
         'HVAC': {'count': 0, 'revenue': 0.0},
@@ -1113,26 +1690,22 @@ def calculate_average_ticket_value(data: pd.DataFrame, tech_name: str, box_a: fl
         'Electric': {'count': 0, 'revenue': 0.0}
     }
     
-    for _, job in opportunity_jobs.iterrows():
+    for narrated, (_, job) in enumerate(opportunity_jobs.iterrows(), start=1):
         revenue = job.get('Jobs Total Revenue', 0) or 0
-        dept_num = extract_department_number(str(job.get('Business Unit', '')))
-        dept = get_department_from_number(dept_num)
+        dept = decode_business_unit(job.get('Business Unit', ''))['Department']
         
         # Update department totals
         if dept in dept_totals:
             dept_totals[dept]['count'] += 1
             dept_totals[dept]['revenue'] += revenue
         
-        logger.debug(f"\nInvoice #{job.get('Invoice #', 'N/A')} - {job['Invoice Date'].strftime('%m/%d/%y')}")
-        logger.debug(f"Customer: {job.get('Customer Name', 'Unknown')}")
-        logger.debug(f"Department: {dept}")
-        logger.debug(f"Business Unit: {job.get('Business Unit', 'Unknown')}")
-        logger.debug(f"Revenue: ${revenue:,.2f}")
-        if pd.notna(job.get('GP')):
-            logger.debug(f"GP: ${job.get('GP', 0):,.2f}")
-    
-    avg_ticket = round(total_revenue / opportunity_count, 2) if opportunity_count > 0 else 0
-    avg_tickets['overall'] = avg_ticket
+        if narrated <= AUDIT_JOBS_PER_TECH:
+            details = [('Department', dept), ('Revenue', f"${revenue:,.2f}")]
+            if pd.notna(job.get('GP')):
+                details.append(('GP', f"${job.get('GP', 0):,.2f}"))
+            logger.debug("")
+            log_job_audit(job, details)
+    log_jobs_not_shown(opportunity_count)
     
     logger.debug("\nDEPARTMENT SUMMARY:")
     logger.debug("-" * 50)
@@ -1157,29 +1730,21 @@ def calculate_average_ticket_value(data: pd.DataFrame, tech_name: str, box_a: fl
     if not non_opp_jobs.empty:
         logger.debug("\nNON-OPPORTUNITY JOBS (Not Included in Average):")
         logger.debug("-" * 50)
-        for _, job in non_opp_jobs.iterrows():
-            logger.debug(f"\nInvoice #{job.get('Invoice #', 'N/A')} - {job['Invoice Date'].strftime('%m/%d/%y')}")
-            logger.debug(f"Customer: {job.get('Customer Name', 'Unknown')}")
-            logger.debug(f"Business Unit: {job.get('Business Unit', 'Unknown')}")
-            logger.debug(f"Revenue: ${job.get('Jobs Total Revenue', 0):,.2f}")
+        for _, job in islice(non_opp_jobs.iterrows(), AUDIT_JOBS_PER_TECH):
+            logger.debug("")
+            log_job_audit(job, [('Revenue', f"${job.get('Jobs Total Revenue', 0):,.2f}")])
+        log_jobs_not_shown(len(non_opp_jobs))
     
     return avg_tickets
 
-def format_department_revenue(revenue_data: Dict[str, Dict[str, float]], 
-                            commission_rate: float,
-                            department_spiffs: Dict[str, float],
-                            subdept_breakdown: Dict[str, Dict[str, float]],
-                            subdepartment_spiffs: Dict[str, float]) -> Dict[str, str]:
-    """Format department and subdepartment revenue data into strings for Excel output."""
+def department_revenue_columns(revenue_data: Dict[str, Dict[str, float]], 
+                               commission_rate: float,
+                               department_spiffs: Dict[str, float],
+                               subdept_breakdown: Dict[str, Dict[str, float]],
+                               subdepartment_spiffs: Dict[str, float]) -> Dict[str, float]:
+    """Department and subdepartment paystats columns, rounded to the cent as shown in paystats.xlsx."""
     formatted = {}
     
-    # Helper function to convert string amounts to float
-    def parse_amount(amount_str: str) -> float:
-        try:
-            return float(amount_str.replace('$', '').replace(',', ''))
-        except (ValueError, AttributeError):
-            return 0.0
-    
     # Initialize department commission totals
     dept_commission_totals = {
         'HVAC': 0.0,
@@ -1194,14 +1759,14 @@ def format_department_revenue(revenue_data: Dict[str, Dict[str, float]],
         spiffs = subdepartment_spiffs.get(subdept_code, 0)
         total = subdept_breakdown['total'].get(subdept_code, 0)
         
-        formatted[f"{subdept_code} Revenue"] = f"${completed:,.2f}"
-        formatted[f"{subdept_code} Sales"] = f"${sales:,.2f}"
-        formatted[f"{subdept_code} Spiffs"] = f"${spiffs:,.2f}"
-        formatted[f"{subdept_code} Total"] = f"${total:,.2f}"
+        formatted[f"{subdept_code} Revenue"] = round(completed, 2)
+        formatted[f"{subdept_code} Sales"] = round(sales, 2)
+        formatted[f"{subdept_code} Spiffs"] = round(spiffs, 2)
+        formatted[f"{subdept_code} Total"] = round(total, 2)
         
         # Calculate commission for this subdepartment, ensuring it's never negative
         calc_total = max(0, (completed + sales - spiffs) * commission_rate)
-        formatted[f"{subdept_code} Commission"] = f"${calc_total:,.2f}"
+        formatted[f"{subdept_code} Commission"] = round(calc_total, 2)
         
         # Add to department totals based on subdepartment code
         if subdept_code.startswith('2'):
@@ -1219,12 +1784,12 @@ def format_department_revenue(revenue_data: Dict[str, Dict[str, float]],
         dept_spiffs = department_spiffs[dept]
         adjusted_combined = max(0, combined - dept_spiffs)
         
-        formatted[f"{dept} Revenue"] = f"${completed:,.2f}"
-        formatted[f"{dept} Sales"] = f"${sales:,.2f}"
-        formatted[f"{dept} Spiffs"] = f"${dept_spiffs:,.2f}"
-        formatted[f"{dept} Total"] = f"${adjusted_combined:,.2f}"
+        formatted[f"{dept} Revenue"] = round(completed, 2)
+        formatted[f"{dept} Sales"] = round(sales, 2)
+        formatted[f"{dept} Spiffs"] = round(dept_spiffs, 2)
+        formatted[f"{dept} Total"] = round(adjusted_combined, 2)
         # Use the summed commission from subdepartments
-        formatted[f"{dept} Commission"] = f"${dept_commission_totals[dept]:,.2f}"
+        formatted[f"{dept} Commission"] = round(dept_commission_totals[dept], 2)
     
     return formatted
 
@@ -1240,23 +1805,16 @@ def calculate_department_revenue(data: pd.DataFrame, tech_name: str, base_date:
         'combined': {'HVAC': 0.0, 'Plumbing': 0.0, 'Electric': 0.0, 'Unknown': 0.0}
     }
     
-    if not pd.api.types.is_datetime64_any_dtype(data['Invoice Date']):
-        data['Invoice Date'] = pd.to_datetime(data['Invoice Date'])
-
     # Get completed jobs within date range
     completed_jobs = data[
         (data['Primary Technician'] == tech_name) &
-        (data['Invoice Date'].dt.date >= start_of_week.date()) &
-        (data['Invoice Date'].dt.date <= end_of_week.date())
+        in_week_mask(data['Invoice Date'], base_date)
     ]
     
     # Process completed jobs by department
+    completed_depts = business_unit_field(completed_jobs['Business Unit'], 'Department')
     for dept in ['HVAC', 'Plumbing', 'Electric']:
-        dept_completed_jobs = completed_jobs[
-            completed_jobs['Business Unit'].apply(
-                lambda x: get_department_from_number(extract_department_number(str(x))) == dept
-            )
-        ]
+        dept_completed_jobs = completed_jobs[completed_depts == dept]
         
         dept_total = 0.0
         for _, job in dept_completed_jobs.iterrows():
@@ -1271,17 +1829,13 @@ def calculate_department_revenue(data: pd.DataFrame, tech_name: str, base_date:
     sold_jobs = data[
         (data['Sold By'] == tech_name) & 
         (data['Primary Technician'] != tech_name) &
-        (data['Invoice Date'].dt.date >= start_of_week.date()) &
-        (data['Invoice Date'].dt.date <= end_of_week.date())
+        in_week_mask(data['Invoice Date'], base_date)
     ]
     
     # Process sold jobs by department
+    sold_depts = business_unit_field(sold_jobs['Business Unit'], 'Department')
     for dept in ['HVAC', 'Plumbing', 'Electric']:
-        dept_sold_jobs = sold_jobs[
-            sold_jobs['Business Unit'].apply(
-                lambda x: get_department_from_number(extract_department_number(str(x))) == dept
-            )
-        ]
+        dept_sold_jobs = sold_jobs[sold_depts == dept]
         
         dept_total = 0.0
         for _, job in dept_sold_jobs.iterrows():
@@ -1293,160 +1847,365 @@ def calculate_department_revenue(data: pd.DataFrame, tech_name: str, base_date:
     
     return revenue_by_dept
 
+def ordered_group_sum(frame: pd.DataFrame, by: List[str], column: str) -> pd.Series:
+    """Grouped sum of a column that adds the values in row order, like a running += total.
+
+    groupby().sum() uses compensated summation, which can differ from the per-row
+    loops in the last bits and flip a half-cent rounding.
+    """
+    grouped = frame.groupby(by)
+    codes = grouped.ngroup()  # NaN for rows with a missing key
+    valid = codes.notna().to_numpy()
+    totals = np.zeros(grouped.ngroups)
+    np.add.at(totals, codes[valid].to_numpy(dtype=int), frame[column].to_numpy(dtype=float)[valid])
+    return pd.Series(totals, index=grouped.size().index)
+
+def calculate_service_metrics(data: pd.DataFrame, tech_names: List[str]) -> Dict[str, dict]:
+    """Job metrics for every technician in one pass over the week's jobs.
+
+    data holds only the jobs invoiced in the week (see WeekSnapshot.jobs_in_week).
+    Returns, per technician, the same Box A/B/C totals, subdepartment breakdown,
+    department revenue and average ticket that calculate_box_metrics,
+    calculate_department_revenue and calculate_average_ticket_value produce.
+    """
+    business_units = decode_business_units(data['Business Unit'])
+    jobs = pd.DataFrame({
+        'primary': data['Primary Technician'],
+        'sold_by': data['Sold By'],
+        'revenue': data['Jobs Total Revenue'].fillna(0.0),
+        'subdept': business_units['Subdept'],
+        'department': business_units['Department'],
+    })
+    sold_by_other = jobs['sold_by'] != jobs['primary']
+
+    # Box A counts opportunity jobs completed as primary tech, Box B jobs sold for another tech.
+    # Completed rows come first so running totals add up in the same order as the per-tech loops.
+    credited = pd.concat([
+        jobs[data['Opportunity'].astype(bool)].assign(tech=jobs['primary'], kind='completed'),
+        jobs[sold_by_other].assign(tech=jobs['sold_by'], kind='sales'),
+    ])
+    def totals_by(by):
+        """{(tech, ...): {last key: revenue}} from one in-order grouped sum."""
+        nested = defaultdict(dict)
+        for keys, total in ordered_group_sum(credited, by, 'revenue').items():
+            nested[keys[:-1]][keys[-1]] = total
+        return nested
+
+    box_totals = totals_by(['tech', 'kind'])
+    avg_tickets = calculate_average_tickets(data, {
+        tech_name: box_totals[(tech_name,)].get('completed', 0.0) + box_totals[(tech_name,)].get('sales', 0.0)
+        for tech_name in tech_names
+    })
+    subdept_totals = totals_by(['tech', 'kind', 'subdept'])
+    subdept_combined = totals_by(['tech', 'subdept'])
+    dept_totals = totals_by(['tech', 'kind', 'department'])
+
+    metrics = {}
+    for tech_name in tech_names:
+        tech_box_a = box_totals[(tech_name,)].get('completed', 0.0)
+        tech_box_b = box_totals[(tech_name,)].get('sales', 0.0)
+        tech_box_c = tech_box_a + tech_box_b
+
+        subdept_breakdown = {
+            'completed': {code: 0.0 for code in SUBDEPARTMENT_MAP.keys()},
+            'sales': {code: 0.0 for code in SUBDEPARTMENT_MAP.keys()},
+            'total': {code: 0.0 for code in SUBDEPARTMENT_MAP.keys()}
+        }
+        for kind in ('completed', 'sales'):
+            for code, total in subdept_totals[(tech_name, kind)].items():
+                if code in SUBDEPARTMENT_MAP:
+                    subdept_breakdown[kind][code] = total
+        for code, total in subdept_combined[(tech_name,)].items():
+            if code in SUBDEPARTMENT_MAP:
+                subdept_breakdown['total'][code] = total
+            else:
+                logger.warning(f"{tech_name}: subdepartment {code} is not in SUBDEPARTMENT_MAP; "
+                               f"${total:,.2f} counts in Box A/B but is left out of the subdepartment breakdown")
+
+        dept_revenue = {
+            'completed': {'HVAC': 0.0, 'Plumbing': 0.0, 'Electric': 0.0, 'Unknown': 0.0},
+            'sales': {'HVAC': 0.0, 'Plumbing': 0.0, 'Electric': 0.0, 'Unknown': 0.0},
+            'combined': {'HVAC': 0.0, 'Plumbing': 0.0, 'Electric': 0.0, 'Unknown': 0.0}
+        }
+        for dept in ['HVAC', 'Plumbing', 'Electric']:
+            dept_completed = dept_totals[(tech_name, 'completed')].get(dept, 0.0)
+            dept_sold = dept_totals[(tech_name, 'sales')].get(dept, 0.0)
+            dept_revenue['completed'][dept] = dept_completed
+            dept_revenue['sales'][dept] = dept_sold
+            dept_revenue['combined'][dept] = dept_completed + dept_sold
+
+        tech_tickets = avg_tickets[tech_name]
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"{tech_name}: Box A (CJR) ${tech_box_a:,.2f}, Box B (TSIS) ${tech_box_b:,.2f}, "
+                         f"Box C ${tech_box_c:,.2f}, avg ticket ${tech_tickets['overall']:,.2f} "
+                         f"(HVAC ${tech_tickets['HVAC']:,.2f}, Plumbing ${tech_tickets['Plumbing']:,.2f}, "
+                         f"Electric ${tech_tickets['Electric']:,.2f})")
+
+        metrics[tech_name] = {
+            'box_a': tech_box_a,
+            'box_b': tech_box_b,
+            'box_c': tech_box_c,
+            'subdept_breakdown': subdept_breakdown,
+            'dept_revenue': dept_revenue,
+            'avg_tickets': tech_tickets,
+        }
+
+    return metrics
+
 def get_commission_rate(total_revenue: float, flipped_percent: float, department: str, 
                        excused_hours: int, tgl_reduction: float, avg_ticket_value: float) -> Tuple[float, list, list]:
     """Calculate commission rate and thresholds based on revenue and department."""
-    logger.debug("\nDETAILED THRESHOLD CALCULATION")
-    logger.debug("=" * 80)
+    audit = logger.isEnabledFor(logging.DEBUG)
+    if audit:
+        logger.debug("\nDETAILED THRESHOLD CALCULATION")
+        logger.debug("=" * 80)
     
     # Round flipped percent to nearest 10
     flipped_percent = min(100, max(0, int(round(flipped_percent / 10) * 10)))
-    logger.debug(f"Install Contribution Percentage (ICP): {flipped_percent}%")
     
     # Get base thresholds
     if department in ['Electric', 'Plumbing']:
         thresholds = PLUMBING_ELECTRICAL_THRESHOLDS
-        logger.debug(f"Using {department} threshold table")
     else:
         thresholds = HVAC_THRESHOLDS
-        logger.debug("Using HVAC threshold table")
     
     tier_thresholds = thresholds[flipped_percent].copy()
-    logger.debug(f"\nBase thresholds for {department} at {flipped_percent}% ICP:")
-    logger.debug(f"2% Tier: ${tier_thresholds[0]:,.2f}")
-    logger.debug(f"3% Tier: ${tier_thresholds[1]:,.2f}")
-    logger.debug(f"4% Tier: ${tier_thresholds[2]:,.2f}")
-    logger.debug(f"5% Tier: ${tier_thresholds[3]:,.2f}")
     
     # Calculate time off reduction
     days_off = min(5, excused_hours / 8)
     reduction_factor = max(0, 1 - (0.20 * days_off))
-    logger.debug(f"\nTime Off Adjustment:")
-    logger.debug(f"Excused Hours: {excused_hours}")
-    logger.debug(f"Days Off: {days_off}")
-    logger.debug(f"Reduction Factor: {reduction_factor:.2f} (Reduces thresholds by {(1-reduction_factor)*100:.1f}%)")
     
     # Apply time off reduction
     time_off_adjusted = [threshold * reduction_factor for threshold in tier_thresholds]
-    logger.debug("\nThresholds after time off adjustment:")
-    logger.debug(f"2% Tier: ${time_off_adjusted[0]:,.2f}")
-    logger.debug(f"3% Tier: ${time_off_adjusted[1]:,.2f}")
-    logger.debug(f"4% Tier: ${time_off_adjusted[2]:,.2f}")
-    logger.debug(f"5% Tier: ${time_off_adjusted[3]:,.2f}")
-    
-   # Calculate and apply TGL reduction
-    tgl_count = int(tgl_reduction / avg_ticket_value) if avg_ticket_value > 0 else 0
-    logger.debug("\nTGL Reduction Calculation:")
-    logger.debug(f"Number of Valid TGLs: {tgl_count}")
-    logger.debug(f"Average Ticket Value: ${avg_ticket_value:,.2f}")
-    logger.debug(f"TGL Credit = {tgl_count} TGLs × ${avg_ticket_value:,.2f} = ${tgl_reduction:,.2f}")
-    
-    # Show threshold reduction details for each tier
-    logger.debug("\nApplying TGL reduction to each threshold tier:")
-    for i, threshold in enumerate(time_off_adjusted):
-        tier_percent = (i + 2)  # 2%, 3%, 4%, 5%
-        adjusted_value = max(0, threshold - tgl_reduction)
-        reduction = threshold - adjusted_value
-        logger.debug(f"{tier_percent}% Tier: ${threshold:,.2f} - ${tgl_reduction:,.2f} = ${adjusted_value:,.2f}")
-        logger.debug(f"  • Original threshold: ${threshold:,.2f}")
-        logger.debug(f"  • TGL reduction: ${tgl_reduction:,.2f}")
-        logger.debug(f"  • Final threshold: ${adjusted_value:,.2f}")
     
     # Apply TGL reduction
     adjusted_thresholds = [max(0, threshold - tgl_reduction) for threshold in time_off_adjusted]
-    logger.debug("\nFinal thresholds after TGL reduction:")
-    logger.debug(f"2% Tier: ${adjusted_thresholds[0]:,.2f}")
-    logger.debug(f"3% Tier: ${adjusted_thresholds[1]:,.2f}")
-    logger.debug(f"4% Tier: ${adjusted_thresholds[2]:,.2f}")
-    logger.debug(f"5% Tier: ${adjusted_thresholds[3]:,.2f}")
 
     # Determine commission rate based on highest threshold met
-    logger.debug("\nRevenue vs Threshold Comparison:")
-    logger.debug(f"Total Revenue: ${total_revenue:,.2f}")
-    
     if total_revenue >= adjusted_thresholds[3]:
         rate = 0.05
-        logger.debug(f"Revenue exceeds 5% tier (${adjusted_thresholds[3]:,.2f})")
     elif total_revenue >= adjusted_thresholds[2]:
         rate = 0.04
-        logger.debug(f"Revenue exceeds 4% tier (${adjusted_thresholds[2]:,.2f})")
     elif total_revenue >= adjusted_thresholds[1]:
         rate = 0.03
-        logger.debug(f"Revenue exceeds 3% tier (${adjusted_thresholds[1]:,.2f})")
     elif total_revenue >= adjusted_thresholds[0]:
         rate = 0.02
-        logger.debug(f"Revenue exceeds 2% tier (${adjusted_thresholds[0]:,.2f})")
     else:
         rate = 0
-        logger.debug("Revenue did not meet minimum threshold")
-        logger.debug(f"Needed ${adjusted_thresholds[0]:,.2f} for 2% tier, short by ${adjusted_thresholds[0] - total_revenue:,.2f}")
-    
-    logger.debug(f"\nFinal Commission Rate: {rate*100}%")
+
+    if audit:
+        logger.debug(f"Install Contribution Percentage (ICP): {flipped_percent}%")
+        logger.debug(f"Using {'HVAC' if thresholds is HVAC_THRESHOLDS else department} threshold table")
+        logger.debug(f"\nBase thresholds for {department} at {flipped_percent}% ICP:")
+        for i, threshold in enumerate(tier_thresholds):
+            logger.debug(f"{i + 2}% Tier: ${threshold:,.2f}")
+
+        logger.debug(f"\nTime Off Adjustment:")
+        logger.debug(f"Excused Hours: {excused_hours}")
+        logger.debug(f"Days Off: {days_off}")
+        logger.debug(f"Reduction Factor: {reduction_factor:.2f} (Reduces thresholds by {(1-reduction_factor)*100:.1f}%)")
+        logger.debug("\nThresholds after time off adjustment:")
+        for i, threshold in enumerate(time_off_adjusted):
+            logger.debug(f"{i + 2}% Tier: ${threshold:,.2f}")
+
+        tgl_count = int(tgl_reduction / avg_ticket_value) if avg_ticket_value > 0 else 0
+        logger.debug("\nTGL Reduction Calculation:")
+        logger.debug(f"Number of Valid TGLs: {tgl_count}")
+        logger.debug(f"Average Ticket Value: ${avg_ticket_value:,.2f}")
+        logger.debug(f"TGL Credit = {tgl_count} TGLs × ${avg_ticket_value:,.2f} = ${tgl_reduction:,.2f}")
+        logger.debug("\nFinal thresholds after TGL reduction:")
+        for i, (threshold, adjusted_value) in enumerate(zip(time_off_adjusted, adjusted_thresholds)):
+            logger.debug(f"{i + 2}% Tier: ${threshold:,.2f} - ${tgl_reduction:,.2f} = ${adjusted_value:,.2f}")
+
+        logger.debug("\nRevenue vs Threshold Comparison:")
+        logger.debug(f"Total Revenue: ${total_revenue:,.2f}")
+        if rate > 0:
+            logger.debug(f"Revenue exceeds {rate*100:.0f}% tier (${adjusted_thresholds[round(rate * 100) - 2]:,.2f})")
+        else:
+            logger.debug("Revenue did not meet minimum threshold")
+            logger.debug(f"Needed ${adjusted_thresholds[0]:,.2f} for 2% tier, short by ${adjusted_thresholds[0] - total_revenue:,.2f}")
+        logger.debug(f"\nFinal Commission Rate: {rate*100}%")
     return rate, adjusted_thresholds, tier_thresholds
 
+def get_commission_rates(total_revenue, flipped_percent, department, excused_hours,
+                         tgl_reduction, avg_ticket_value) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Array form of get_commission_rate: every argument holds one value per tech.
+
+    Returns the commission rates, the adjusted thresholds and the base thresholds,
+    the thresholds as one row of four tiers (2% to 5%) per tech.
+    """
+    total_revenue = np.asarray(total_revenue, dtype=float)
+    tgl_reduction = np.asarray(tgl_reduction, dtype=float)
+
+    # Round flipped percent to nearest 10 and pick each tech's row of the threshold table
+    flipped_percent = np.clip(np.round(np.asarray(flipped_percent, dtype=float) / 10) * 10, 0, 100)
+    icp_rows = (flipped_percent // 10).astype(int)
+    uses_pe_table = np.isin(np.asarray(department, dtype=object), ['Electric', 'Plumbing'])
+    base_thresholds = np.where(
+        uses_pe_table[:, None],
+        PLUMBING_ELECTRICAL_THRESHOLD_ARRAY[icp_rows],
+        HVAC_THRESHOLD_ARRAY[icp_rows]
+    )
+
+    # Time off reduction, then TGL reduction
+    days_off = np.minimum(5, np.asarray(excused_hours, dtype=float) / 8)
+    reduction_factor = np.maximum(0, 1 - (0.20 * days_off))
+    time_off_adjusted = base_thresholds * reduction_factor[:, None]
+    adjusted_thresholds = np.maximum(0, time_off_adjusted - tgl_reduction[:, None])
+
+    # Highest tier whose threshold the revenue meets, -1 if none
+    met = total_revenue[:, None] >= adjusted_thresholds
+    tier = np.where(met.any(axis=1), 3 - np.argmax(met[:, ::-1], axis=1), -1)
+    rates = np.where(tier >= 0, COMMISSION_TIER_RATES[tier], 0.0)
+
+    if logger.isEnabledFor(logging.DEBUG):
+        for i in range(len(rates)):
+            logger.debug(f"ICP {flipped_percent[i]:.0f}%, {excused_hours[i]} excused hours, "
+                         f"TGL credit ${tgl_reduction[i]:,.2f} (avg ticket ${avg_ticket_value[i]:,.2f}): "
+                         f"thresholds {format_threshold_scale(adjusted_thresholds[i])}, "
+                         f"revenue ${total_revenue[i]:,.2f}, rate {rates[i]*100}%")
+    return rates, adjusted_thresholds, base_thresholds
+
+def gather_tech_inputs(tech_name: str, inputs: dict, metrics: Optional[dict] = None) -> dict:
+    """Everything process_commission_calculations needs for one tech before pricing its tier.
+
+    inputs holds the shared read-only data (see process_commission_calculations). metrics is
+    the tech's entry from calculate_service_metrics; without it the per-tech functions run.
+    """
+    data, base_date = inputs['data'], inputs['base_date']
+    tech_data = inputs['tech_data']
+    logger.info(f"\nProcessing technician: {tech_name}")
+    # Get badge ID from tech_data
+    badge_id = tech_data.loc[tech_data['Name'] == tech_name, 'Badge ID'].iloc[0]
+    
+    # Calculate metrics
+    if metrics is not None:
+        box_a, box_b, box_c = metrics['box_a'], metrics['box_b'], metrics['box_c']
+        subdept_breakdown = metrics['subdept_breakdown']
+        dept_revenue = metrics['dept_revenue']
+    else:
+        box_a, box_b, box_c, subdept_breakdown = calculate_box_metrics(data, tech_name, base_date)
+        dept_revenue = calculate_department_revenue(data, tech_name, base_date)
+    scp, icp = calculate_percentages(box_a, box_c)
+    
+    # Get department spiffs (used for actual calculations)
+    spiffs_total, department_spiffs = get_spiffs_total(inputs['spiffs'], tech_name)
+    
+    # Get subdepartment spiffs (for display only)
+    subdepartment_spiffs = get_subdepartment_spiffs(inputs['spiffs'], tech_name)
+    
+    valid_tgls = inputs['valid_tgls'].get(tech_name, [])
+    
+    if metrics is not None:
+        avg_tickets = metrics['avg_tickets']
+    else:
+        avg_tickets = calculate_average_ticket_value(data, tech_name, box_a, box_b, base_date, logger)
+    default_ticket = 0.0
+    avg_ticket_value = avg_tickets.get('overall', default_ticket) if avg_tickets else default_ticket
+    
+    # Get exact business unit from mapping
+    business_unit = inputs['tech_dept_map'].get(tech_name, 'Unknown')
+    
+    # Extract department for commission calculations only
+    department = decode_business_unit(business_unit)['Department']
+
+    tgl_reduction = avg_ticket_value * len(valid_tgls) if avg_ticket_value > 0 else 0
+    
+    excused_hours = inputs['excused_hours_dict'].get(tech_name, 0)
+
+    return {
+        'tech_name': tech_name, 'badge_id': badge_id, 'business_unit': business_unit,
+        'box_a': box_a, 'box_b': box_b, 'box_c': box_c, 'scp': scp, 'icp': icp,
+        'subdept_breakdown': subdept_breakdown, 'dept_revenue': dept_revenue,
+        'spiffs_total': spiffs_total, 'department_spiffs': department_spiffs,
+        'subdepartment_spiffs': subdepartment_spiffs, 'valid_tgls': valid_tgls,
+        'avg_ticket_value': avg_ticket_value, 'department': department,
+        'tgl_reduction': tgl_reduction, 'excused_hours': excused_hours,
+    }
+
+def per_tech_commission(tech_name: str, inputs: dict) -> Tuple[dict, tuple]:
+    """Per-tech engine for one technician: its inputs and get_commission_rate's result."""
+    tech = gather_tech_inputs(tech_name, inputs)
+    tier = get_commission_rate(tech['box_c'], tech['icp'], tech['department'], tech['excused_hours'],
+                               tech['tgl_reduction'], tech['avg_ticket_value'])
+    return tech, tier
+
+# Shared read-only inputs of a per-tech commission worker process, set once by its initializer
+_commission_inputs: Optional[dict] = None
+
+def _init_commission_worker(inputs: dict):
+    global _commission_inputs
+    _commission_inputs = inputs
+
+def _per_tech_commission_worker(tech_name: str) -> Tuple[dict, tuple]:
+    return per_tech_commission(tech_name, _commission_inputs)
+
 def process_commission_calculations(data: pd.DataFrame, tech_data: pd.DataFrame, 
-                                 file_path: str, base_date: datetime,
+                                 snapshot: WeekSnapshot, base_date: datetime,
                                  excused_hours_dict: Dict[str, int]) -> pd.DataFrame:
     results = []
     
     # Filter tech_data to only include service technicians
     service_techs = tech_data[
         (~tech_data['Name'].isin(EXCLUDED_TECHS)) &
-        (tech_data['Technician Business Unit'].apply(
-            lambda x: determine_tech_type(x) == 'SERVICE'
-        ))
+        (business_unit_field(tech_data['Technician Business Unit'], 'Tech Type') == 'SERVICE')
     ]['Name'].tolist()
     
-    # Create a mapping of technician names to their exact business units
-    tech_dept_map = dict(zip(tech_data['Name'], tech_data['Technician Business Unit']))
-
-    for tech_name in service_techs:
-        logger.info(f"\nProcessing technician: {tech_name}")
-        # Get badge ID from tech_data
-        badge_id = tech_data.loc[tech_data['Name'] == tech_name, 'Badge ID'].iloc[0]
-        
-        # Calculate metrics
-        box_a, box_b, box_c, subdept_breakdown = calculate_box_metrics(data, tech_name, base_date)
-        scp, icp = calculate_percentages(box_a, box_c)
-        
-        dept_revenue = calculate_department_revenue(data, tech_name, base_date)
-        
-        # Get department spiffs (used for actual calculations)
-        spiffs_total, department_spiffs = get_spiffs_total(file_path, tech_name)
-        
-        # Get subdepartment spiffs (for display only)
-        subdepartment_spiffs = get_subdepartment_spiffs(file_path, tech_name)
-        
-        valid_tgls = get_valid_tgls(file_path, tech_name)
-        
-        avg_tickets = calculate_average_ticket_value(data, tech_name, box_a, box_b, base_date, logger)
-        default_ticket = 0.0
-        avg_ticket_value = avg_tickets.get('overall', default_ticket) if avg_tickets else default_ticket
-        
-        # Get exact business unit from mapping
-        business_unit = tech_dept_map.get(tech_name, 'Unknown')
-        
-        # Extract department for commission calculations only
-        dept_num = extract_department_number(business_unit)
-        department = get_department_from_number(dept_num)
+    # Only the service techs' spiffs go through the memo check, as before the pivot
+    snapshot.spiff_pivot().report_invalid_memos(service_techs)
+
+    inputs = {
+        'data': data,
+        'tech_data': tech_data,
+        'spiffs': snapshot.spiff_pivot(),
+        'valid_tgls': snapshot.valid_tgls(),
+        'base_date': base_date,
+        'excused_hours_dict': excused_hours_dict,
+        # Mapping of technician names to their exact business units
+        'tech_dept_map': dict(zip(tech_data['Name'], tech_data['Technician Business Unit'])),
+    }
 
-        tgl_reduction = avg_ticket_value * len(valid_tgls) if avg_ticket_value > 0 else 0
-        
-        excused_hours = excused_hours_dict.get(tech_name, 0)
-        
-        commission_rate, adjusted_thresholds, base_thresholds = get_commission_rate(
-            box_c, icp, department, excused_hours, tgl_reduction, avg_ticket_value
+    # The per-job and per-threshold audit narration lives in the per_tech functions, and its
+    # lines only reach the log file in order when the technicians are computed in this process
+    if COMMISSION_ENGINE == 'grouped' and not AUDIT_LOGGING:
+        service_metrics = calculate_service_metrics(data, service_techs)
+        techs = [gather_tech_inputs(tech_name, inputs, service_metrics[tech_name]) for tech_name in service_techs]
+        # Commission tiers for all techs at once
+        rates, adjusted, base = get_commission_rates(
+            *([tech[key] for tech in techs] for key in
+              ('box_c', 'icp', 'department', 'excused_hours', 'tgl_reduction', 'avg_ticket_value'))
         )
-        
+        tiers = list(zip(rates.tolist(), adjusted.tolist(), base.tolist()))
+    else:
+        if AUDIT_LOGGING:
+            logger.info("Verbose audit: computing technicians in turn with the per_tech engine")
+        workers = 1 if AUDIT_LOGGING else min(COMMISSION_WORKERS, MAX_POOL_WORKERS, len(service_techs))
+        if workers <= 1:
+            computed = [per_tech_commission(tech_name, inputs) for tech_name in service_techs]
+        else:
+            # Each worker receives the shared inputs once; map keeps the technicians' order
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_commission_worker,
+                                     initargs=(inputs,)) as pool:
+                computed = list(pool.map(_per_tech_commission_worker, service_techs,
+                                         chunksize=max(1, len(service_techs) // (workers * 4))))
+            logger.debug(f"Computed {len(computed)} technicians with {workers} worker processes")
+        techs = [tech for tech, _ in computed]
+        tiers = [tier for _, tier in computed]
+
+    for tech, (commission_rate, adjusted_thresholds, base_thresholds) in zip(techs, tiers):
+        tech_name, badge_id, business_unit = tech['tech_name'], tech['badge_id'], tech['business_unit']
+        box_a, box_b, box_c = tech['box_a'], tech['box_b'], tech['box_c']
+        spiffs_total, valid_tgls = tech['spiffs_total'], tech['valid_tgls']
+
         base_threshold_scale = format_threshold_scale(base_thresholds)
         adjusted_threshold_scale = format_threshold_scale(adjusted_thresholds)
         
-        formatted_dept_data = format_department_revenue(
-            dept_revenue,
+        dept_columns = department_revenue_columns(
+            tech['dept_revenue'],
             commission_rate,
-            department_spiffs,
-            subdept_breakdown,
-            subdepartment_spiffs
+            tech['department_spiffs'],
+            tech['subdept_breakdown'],
+            tech['subdepartment_spiffs']
         )
         
         # Calculate final commission using original logic (department level spiffs)
@@ -1460,13 +2219,13 @@ def process_commission_calculations(data: pd.DataFrame, tech_data: pd.DataFrame,
             'Total Revenue': box_c,
             'Completed Job Revenue': box_a,
             'Tech-Sourced Install Sales': box_b,
-            'Service Completion %': scp,
-            'Install Contribution %': icp,
-            'Excused Hours': excused_hours,
+            'Service Completion %': tech['scp'],
+            'Install Contribution %': tech['icp'],
+            'Excused Hours': tech['excused_hours'],
             'Spiffs': spiffs_total,
             'Valid TGLs': len(valid_tgls),
-            'Avg Ticket $': avg_ticket_value,
-            'TGL Threshold Reduction': tgl_reduction,
+            'Avg Ticket $': tech['avg_ticket_value'],
+            'TGL Threshold Reduction': tech['tgl_reduction'],
             'Base Threshold Scale': base_threshold_scale,
             'Adjusted Threshold Scale': adjusted_threshold_scale,
             'Commissionable Revenue': commissionable_revenue,
@@ -1475,8 +2234,8 @@ def process_commission_calculations(data: pd.DataFrame, tech_data: pd.DataFrame,
             'Status': f"Qualified for {commission_rate*100}% tier" if commission_rate > 0 else "Did not qualify"
         }
         
-        # Add formatted department data including display-only subdepartment spiffs
-        result.update(formatted_dept_data)
+        # Add department data including display-only subdepartment spiffs
+        result.update(dept_columns)
         results.append(result)
 
     results_df = pd.DataFrame(results)
@@ -1488,17 +2247,16 @@ def process_commission_calculations(data: pd.DataFrame, tech_data: pd.DataFrame,
     
     return results_df[COLUMN_ORDER]
 
-def read_tech_department_data(file_path: str, logger: logging.Logger) -> pd.DataFrame:
+def read_tech_department_data(snapshot: WeekSnapshot, logger: logging.Logger) -> pd.DataFrame:
     try:
-        logger.debug(f"Reading technician department data from {file_path}")
-        # Read the Excel file
-        tech_df = pd.read_excel(file_path, sheet_name='Sheet1_Tech', dtype={'Payroll ID': str})
+        logger.debug("Reading technician department data from week snapshot")
+        tech_df = snapshot.tech
         
         # Remove rows where Name is numeric
         tech_df = tech_df[~tech_df['Name'].astype(str).str.isnumeric()]
         
         # Filter out excluded techs
-        tech_df = tech_df[~tech_df['Name'].isin(EXCLUDED_TECHS)]
+        tech_df = tech_df[~tech_df['Name'].isin(EXCLUDED_TECHS)].copy()
         
         # Format badge IDs
         tech_df['Badge ID'] = tech_df['Payroll ID'].apply(format_badge_id)
@@ -1523,30 +2281,33 @@ def determine_pay_code(business_unit: str) -> Optional[str]:
     else:
         return 'ICM'
 
-def sum_spiffs_for_dept(spiffs_df: pd.DataFrame, tech_name: str, dept_code: str) -> float:
+def sum_spiffs_for_dept(spiffs: SpiffPivot, tech_name: str, dept_code: str) -> float:
     """Sum spiffs for a specific technician and department code."""
-    dept_spiffs = spiffs_df[
-        (spiffs_df['Technician'] == tech_name) & 
-        (spiffs_df['Memo'].apply(lambda x: extract_dept_code(str(x)) == dept_code)) &
-        (spiffs_df['Amount'].apply(
-            lambda x: float(str(x).replace('$', '').replace(',', '')) > 0 
-            if pd.notnull(x) else False
-        ))
-    ]
-    
-    if dept_spiffs.empty:
-        return 0.0
-        
-    amounts = dept_spiffs['Amount'].apply(
-        lambda x: float(str(x).replace('$', '').replace(',', '')) if pd.notnull(x) else 0.0
-    )
-    
-    return amounts.sum()
+    return spiffs.pcm_positive_for(tech_name).get(dept_code, 0.0)
 
-def process_paystats(output_dir: str, paystats_file: str, tech_data: pd.DataFrame, 
-                    base_date: datetime, logger: logging.Logger) -> List[PayrollEntry]:
-    logger.info("Processing payroll entries from paystats file...")
-    payroll_entries = []
+def format_paystats(paystats: pd.DataFrame) -> pd.DataFrame:
+    """Copy of the paystats frame with the department amounts rendered for paystats.xlsx."""
+    formatted = paystats.copy()
+    for col in PAYSTATS_CURRENCY_COLUMNS:
+        formatted[col] = formatted[col].map(format_currency)
+    return formatted
+
+def round_cents(values) -> np.ndarray:
+    """Round every value to the cent exactly like round(value, 2).
+
+    np.round scales by 100 before rounding, which can land a value such as 2.675
+    on the other side of the half cent.
+    """
+    return np.array([round(value, 2) for value in np.asarray(values, dtype=float).tolist()])
+
+def process_paystats(snapshot: WeekSnapshot, paystats: pd.DataFrame, tech_data: pd.DataFrame, 
+                    base_date: datetime, logger: logging.Logger) -> PayrollBatch:
+    """PCM entries from the numeric paystats frame returned by process_calculations.
+
+    The paystats amounts are reshaped to one row per technician and subdepartment,
+    in paystats row and DEPARTMENT_CODES order, and priced as whole columns.
+    """
+    logger.info("Processing payroll entries from paystats...")
 
     try:
         # Calculate week range and end date
@@ -1554,130 +2315,84 @@ def process_paystats(output_dir: str, paystats_file: str, tech_data: pd.DataFram
         week_end_date = start_of_week + timedelta(days=6)
         target_date = week_end_date.strftime('%m/%d/%Y')
         
-        stats_df = pd.read_excel(paystats_file)
-        adj_df = pd.read_excel(os.path.join(output_dir, 'combined_data.xlsx'), 
-                             sheet_name='Direct Payroll Adjustments')
+        spiffs = snapshot.spiff_pivot()
 
-        # Filter to include only service technicians
-        stats_df = stats_df[
-            (~stats_df['Technician'].isin(EXCLUDED_TECHS)) &
-            (stats_df['Technician'].isin(
+        # Filter to include only service technicians with a commission rate
+        stats_df = paystats[
+            (~paystats['Technician'].isin(EXCLUDED_TECHS)) &
+            (paystats['Technician'].isin(
                 tech_data[
-                    tech_data['Technician Business Unit'].apply(
-                        lambda x: determine_tech_type(x) == 'SERVICE'
-                    )
+                    business_unit_field(tech_data['Technician Business Unit'], 'Tech Type') == 'SERVICE'
                 ]['Name']
-            ))
+            )) &
+            (paystats['Commission Rate %'] != 0)
         ]
 
-        # Process each technician's entries
-        for _, row in stats_df.iterrows():
-            tech_name = row['Technician']
-            commission_rate = row['Commission Rate %'] / 100
-
-            # Skip if no commission rate
-            if commission_rate == 0:
-                continue
-
-            # Get technician info
-            tech_info = tech_data[tech_data['Name'] == tech_name]
-            if tech_info.empty:
-                continue
-
-            # Get badge ID (try both Badge ID and Payroll ID fields)
-            badge_id = None
-            if 'Badge ID' in tech_info.columns:
-                badge_id = tech_info.iloc[0]['Badge ID'] if pd.notna(tech_info.iloc[0]['Badge ID']) else None
-            if badge_id is None and 'Payroll ID' in tech_info.columns:
-                badge_id = tech_info.iloc[0]['Payroll ID'] if pd.notna(tech_info.iloc[0]['Payroll ID']) else None
-            
-            if badge_id is None:
-                logger.warning(f"Skipping {tech_name} - No valid Badge ID or Payroll ID found")
-                continue
-            
-            # Process each subdepartment
-            for dept_code in DEPARTMENT_CODES.keys():
-                revenue_col = f"{dept_code} Revenue"
-                sales_col = f"{dept_code} Sales"
-                total_col = f"{dept_code} Total"
-                
-                if not all(col in row.index for col in [revenue_col, sales_col, total_col]):
-                    continue
-                
-                # Parse amounts
-                def parse_amount(val):
-                    if pd.isna(val):
-                        return 0.0
-                    if isinstance(val, str):
-                        return float(val.replace('$', '').replace(',', '').strip() or 0)
-                    return float(val or 0)
-
-                revenue = parse_amount(row[revenue_col])
-                sales = parse_amount(row[sales_col])
-                total = parse_amount(row[total_col])
-
-                if revenue == 0 and sales == 0 and total == 0:
-                    continue
-
-                try:
-                    # Get spiffs for this department
-                    dept_spiffs = adj_df[
-                        (adj_df['Technician'] == tech_name) & 
-                        (adj_df['Memo'].apply(lambda x: extract_dept_code(str(x)) == dept_code))
-                    ]
-                    
-                    # Sum only positive spiffs (negatives are handled separately)
-                    positive_spiffs = sum(
-                        float(str(amount).replace('$', '').replace(',', ''))
-                        for amount in dept_spiffs['Amount']
-                        if pd.notna(amount) and 
-                        float(str(amount).replace('$', '').replace(',', '')) > 0
-                    )
-                    
-                    # Adjust total by positive spiffs only
-                    adjusted_amount = round(total - positive_spiffs, 2)
-                    if adjusted_amount <= 0:
-                        continue
-
-                    final_amount = round(adjusted_amount * commission_rate, 2)
-                    if final_amount <= 0:
-                        continue
-
-                    # Create PCM entry using the service department's main code
-                    main_dept_code = get_service_department_code(dept_code)
-                    entry = PayrollEntry(
-                        company_code=COMPANY_CODE,
-                        badge_id=badge_id,
-                        date=target_date,
-                        amount=final_amount,
-                        pay_code='PCM',
-                        dept=main_dept_code,
-                        location_id=LOCATION_ID
-                    )
-                    payroll_entries.append(entry)
-                    
-                    logger.debug(f"Created PCM entry for {tech_name} in dept {dept_code}:")
-                    logger.debug(f"  Total: ${total:,.2f}")
-                    logger.debug(f"  Positive Spiffs: ${positive_spiffs:,.2f}")
-                    logger.debug(f"  Adjusted Amount: ${adjusted_amount:,.2f}")
-                    logger.debug(f"  Commission Rate: {commission_rate*100}%")
-                    logger.debug(f"  Final Amount: ${final_amount:,.2f}")
-                    logger.debug(f"  Department Code: {main_dept_code}")
-
-                except Exception as e:
-                    logger.warning(f"Error processing department {dept_code} for {tech_name}: {str(e)}")
-                    continue
-
-        return payroll_entries
+        # Badge ID of each technician's first record, falling back to the Payroll ID
+        tech_info = tech_data.drop_duplicates('Name').set_index('Name')
+        badge_ids = pd.Series(None, index=tech_info.index, dtype=object)
+        for id_col in ['Payroll ID', 'Badge ID']:
+            if id_col in tech_info.columns:
+                badge_ids = tech_info[id_col].where(tech_info[id_col].notna(), badge_ids)
+        stats_df = stats_df[stats_df['Technician'].isin(tech_info.index)]
+        stats_badges = stats_df['Technician'].map(badge_ids)
+        for tech_name in stats_df.loc[stats_badges.isna(), 'Technician']:
+            logger.warning(f"Skipping {tech_name} - No valid Badge ID or Payroll ID found")
+        stats_df = stats_df[stats_badges.notna()]
+
+        # One row per (technician, subdepartment), technician-major
+        codes = [
+            code for code in DEPARTMENT_CODES.keys()
+            if all(f"{code} {metric}" in stats_df.columns for metric in ('Revenue', 'Sales', 'Total'))
+        ]
+        tech_names = stats_df['Technician'].to_numpy()
+
+        def long_form(metric):
+            return stats_df[[f"{code} {metric}" for code in codes]].to_numpy(dtype=float).ravel()
+
+        # Positive spiffs only; negatives are netted against the PCM entries later
+        positive_spiffs = spiffs.pcm_positive.reindex(index=tech_names, columns=codes, fill_value=0.0)
+        pcm = pd.DataFrame({
+            'tech': np.repeat(tech_names, len(codes)),
+            'badge_id': np.repeat(stats_badges[stats_badges.notna()].to_numpy(), len(codes)),
+            'subdept': np.tile(codes, len(tech_names)),
+            'revenue': long_form('Revenue'),
+            'sales': long_form('Sales'),
+            'total': long_form('Total'),
+            'positive_spiffs': positive_spiffs.to_numpy(dtype=float).ravel(),
+            'rate': np.repeat(stats_df['Commission Rate %'].to_numpy(dtype=float) / 100, len(codes)),
+        })
+        pcm = pcm[(pcm['revenue'] != 0) | (pcm['sales'] != 0) | (pcm['total'] != 0)]
+
+        # Adjust totals by positive spiffs only, then apply the commission rate
+        pcm = pcm.assign(adjusted=round_cents(pcm['total'] - pcm['positive_spiffs']))
+        pcm = pcm[pcm['adjusted'] > 0]
+        pcm = pcm.assign(amount=round_cents(pcm['adjusted'] * pcm['rate']))
+        pcm = pcm[pcm['amount'] > 0]
+
+        # PCM entries use the service department's main code
+        pcm = pcm.assign(dept=pcm['subdept'].map({code: get_service_department_code(code) for code in codes}))
+
+        if logger.isEnabledFor(logging.DEBUG):
+            for entry in pcm.itertuples(index=False):
+                logger.debug(f"Created PCM entry for {entry.tech} in dept {entry.subdept}:")
+                logger.debug(f"  Total: ${entry.total:,.2f}")
+                logger.debug(f"  Positive Spiffs: ${entry.positive_spiffs:,.2f}")
+                logger.debug(f"  Adjusted Amount: ${entry.adjusted:,.2f}")
+                logger.debug(f"  Commission Rate: {entry.rate*100}%")
+                logger.debug(f"  Final Amount: ${entry.amount:,.2f}")
+                logger.debug(f"  Department Code: {entry.dept}")
+
+        return PayrollBatch.from_columns(pcm['badge_id'], pcm['amount'], pcm['dept'],
+                                         pay_code='PCM', date=target_date)
 
     except Exception as e:
-        logger.error(f"Error processing paystats file: {str(e)}")
+        logger.error(f"Error processing paystats: {str(e)}")
         raise
 
-def process_gp_entries(output_dir: str, tech_data: pd.DataFrame, base_date: datetime, logger: logging.Logger) -> List[PayrollEntry]:
+def process_gp_entries(snapshot: WeekSnapshot, tech_data: pd.DataFrame, base_date: datetime, logger: logging.Logger) -> PayrollBatch:
     """Process GP entries from Invoices sheet, specifically for installers."""
     logger.info("Processing GP entries for installers from Invoices sheet...")
-    payroll_entries = []
 
     try:
         # Calculate week end date (Sunday)
@@ -1685,34 +2400,14 @@ def process_gp_entries(output_dir: str, tech_data: pd.DataFrame, base_date: date
         week_end_date = start_of_week + timedelta(days=6)
         target_date = week_end_date.strftime('%m/%d/%Y')  # Use week end date
 
-        # Read invoices data - specifically from the "Invoices" sheet
-        invoices_df = pd.read_excel(os.path.join(output_dir, 'combined_data.xlsx'), sheet_name='Invoices')
+        # Invoices from the week snapshot, currency columns already parsed by the schema
+        invoices_df = snapshot.invoices
         logger.debug(f"Loaded {len(invoices_df)} invoice records from Invoices sheet")
 
-        # Convert GP column from currency string to float
-        def parse_currency(value):
-            if pd.isna(value):
-                return 0.0
-            if isinstance(value, (int, float)):
-                return float(value)
-            try:
-                cleaned = str(value).replace('$', '').replace(',', '').strip()
-                return float(cleaned) if cleaned else 0.0
-            except (ValueError, TypeError):
-                return 0.0
-
-        # Convert GP and other currency columns
-        currency_columns = ['GP', 'Total', 'Cost', 'Subtotal']
-        for col in currency_columns:
-            if col in invoices_df.columns:
-                invoices_df[col] = invoices_df[col].apply(parse_currency)
-        
         # Filter tech_data to only include installers
         install_techs = tech_data[
             (~tech_data['Name'].isin(EXCLUDED_TECHS)) &
-            (tech_data['Technician Business Unit'].apply(
-                lambda x: determine_tech_type(x) == 'INSTALL'
-            ))
+            (business_unit_field(tech_data['Technician Business Unit'], 'Tech Type') == 'INSTALL')
         ]
         
         logger.info(f"Processing GP for {len(install_techs)} installers")
@@ -1751,59 +2446,35 @@ def process_gp_entries(output_dir: str, tech_data: pd.DataFrame, base_date: date
         
         logger.debug(f"Found {len(grouped)} valid GP entries after grouping")
 
-        for _, row in grouped.iterrows():
-            # Get badge ID (try both Badge ID and Payroll ID fields)
-            badge_id = None
-            if 'Badge ID' in row.index:
-                badge_id = row['Badge ID'] if pd.notna(row['Badge ID']) else None
-            if badge_id is None and 'Payroll ID' in row.index:
-                badge_id = row['Payroll ID'] if pd.notna(row['Payroll ID']) else None
-            
-            if badge_id is None:
-                logger.warning(f"Skipping entry for {row['Name']} - No valid Badge ID or Payroll ID found")
-                continue
-
-            if pd.isna(row['Business Unit']):
-                logger.warning(f"Skipping entry for {row['Name']} due to missing Business Unit")
-                continue
-
-            try:
-                # Extract department code from business unit
-                business_unit = str(row['Business Unit']).upper()
-                dept_codes = re.findall(r'\d{2}', business_unit)
-                if not dept_codes:
-                    logger.warning(f"Could not find department code in business unit: {business_unit}")
-                    continue
-                
-                subdepartment_code = dept_codes[0]
-                dept_code = DEPARTMENT_CODES.get(subdepartment_code, {}).get('code')
-                
-                if not dept_code:
-                    logger.warning(f"Invalid department code {subdepartment_code} found in: {business_unit}")
-                    continue
+        # Badge ID, falling back to the Payroll ID
+        badge_ids = pd.Series(None, index=grouped.index, dtype=object)
+        for id_col in ['Payroll ID', 'Badge ID']:
+            if id_col in grouped.columns:
+                badge_ids = grouped[id_col].where(grouped[id_col].notna(), badge_ids)
+        for name in grouped.loc[badge_ids.isna(), 'Name']:
+            logger.warning(f"Skipping entry for {name} - No valid Badge ID or Payroll ID found")
+        missing_unit = badge_ids.notna() & grouped['Business Unit'].isna()
+        for name in grouped.loc[missing_unit, 'Name']:
+            logger.warning(f"Skipping entry for {name} due to missing Business Unit")
+        grouped = grouped.assign(badge_id=badge_ids)[badge_ids.notna() & ~missing_unit]
+
+        # Department code from the decoded business unit
+        decoded = decode_business_units(grouped['Business Unit'])
+        invalid = decoded['GP Dept Code'].isna()
+        for unit, subdept in zip(grouped.loc[invalid, 'Business Unit'], decoded.loc[invalid, 'GP Subdept']):
+            if subdept is None:
+                logger.warning(f"Could not find department code in business unit: {str(unit).upper()}")
+            else:
+                logger.warning(f"Invalid department code {subdept} found in: {str(unit).upper()}")
+        icm = grouped.assign(dept=decoded['GP Dept Code'])[~invalid]
 
-                gp_value = float(row['GP'])
-                if gp_value <= 0:
-                    logger.debug(f"Skipping non-positive GP value for {row['Name']}: ${gp_value}")
-                    continue
+        if logger.isEnabledFor(logging.DEBUG):
+            for name, gp_value, dept_code in zip(icm['Name'], icm['GP'], icm['dept']):
+                logger.debug(f"Created GP entry for installer {name}: ${gp_value:,.2f} in dept {dept_code}")
 
-                # Create payroll entry with standardized ICM code for installers
-                # and using the week end date
-                entry = PayrollEntry(
-                    company_code=COMPANY_CODE,
-                    badge_id=badge_id,
-                    date=target_date,  # Using week end date
-                    amount=gp_value,
-                    pay_code='ICM',  # Standardized to ICM for all installer entries
-                    dept=dept_code,
-                    location_id=LOCATION_ID
-                )
-                payroll_entries.append(entry)
-                logger.info(f"Created GP entry for installer {row['Name']}: ${gp_value:,.2f} in dept {dept_code}")
-
-            except Exception as e:
-                logger.error(f"Error processing GP entry for {row['Name']}: {str(e)}")
-                continue
+        # ICM entries for installers, dated the week end
+        payroll_entries = PayrollBatch.from_columns(icm['badge_id'], icm['GP'], icm['dept'],
+                                                    pay_code='ICM', date=target_date)
 
         logger.info(f"Successfully processed {len(payroll_entries)} GP entries for installers")
         return payroll_entries
@@ -1826,7 +2497,7 @@ def match_department_spiffs(adj_df: pd.DataFrame, logger: logging.Logger) -> Tup
     # First process TGLs (this part stays the same)
     tgl_rows = adj_df[adj_df['Memo'].str.contains('tgl', case=False, na=False)]
     for _, row in tgl_rows.iterrows():
-        amount = float(str(row['Amount']).replace('$', '').replace(',', ''))
+        amount = float(row['Amount'])
         memo = str(row['Memo']).strip()
         dept_code = memo[:2]
         
@@ -1881,14 +2552,14 @@ def match_department_spiffs(adj_df: pd.DataFrame, logger: logging.Logger) -> Tup
             pd.DataFrame(unmatched_negatives))
 
 
-def process_adjustments(combined_file: str, logger: logging.Logger) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+def process_adjustments(snapshot: WeekSnapshot, logger: logging.Logger) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
     """Process adjustments data."""
     logger.info("Processing adjustments data...")
     
     try:
-        # Read adjustments and tech data
-        adj_df = pd.read_excel(combined_file, sheet_name='Direct Payroll Adjustments')
-        tech_data = pd.read_excel(combined_file, sheet_name='Sheet1_Tech')
+        # Adjustments and tech data from the week snapshot
+        adj_df = snapshot.adjustments
+        tech_data = snapshot.tech
         
         # Filter out excluded techs
         tech_data = tech_data[~tech_data['Name'].isin(EXCLUDED_TECHS)]
@@ -1903,7 +2574,7 @@ def process_adjustments(combined_file: str, logger: logging.Logger) -> Tuple[pd.
                 badge_id = row['Payroll ID'] if pd.notna(row['Payroll ID']) else None
             
             # Get home department from Business Unit
-            home_dept = get_tech_home_department(row['Technician Business Unit'])
+            home_dept = decode_business_unit(row['Technician Business Unit'])['Home Dept']
             
             tech_lookup[row['Name']] = {
                 'Badge ID': badge_id if badge_id is not None else '',
@@ -1934,7 +2605,10 @@ def process_adjustments(combined_file: str, logger: logging.Logger) -> Tuple[pd.
                     logger.debug(f"Skipping entry for tech not found in lookup: {tech_name}")
                     continue
                 
-                amount = float(str(row['Amount']).replace('$', '').replace(',', ''))
+                amount = float(row['Amount'])
+                if pd.isna(amount):
+                    # Blank or unparsable amounts are listed in the load report
+                    continue
                 memo = str(row['Memo']).strip()
                 
                 if 'tgl' in memo.lower():
@@ -2000,88 +2674,109 @@ def process_adjustments(combined_file: str, logger: logging.Logger) -> Tuple[pd.
         logger.error(f"Error processing adjustments: {str(e)}")
         raise
 
-def save_payroll_file(entries: List[PayrollEntry], output_file: str, logger: logging.Logger):
+def consolidate_payroll_entries(entries: PayrollBatch, logger: logging.Logger) -> PayrollBatch:
+    """One entry per Badge ID, Department and Pay Code, summing the amounts of repeated entries."""
+    df = entries.frame
+    duplicate_check = df.groupby(['Badge ID', 'Dept', 'Pay Code', 'Company Code', 'Date', 'Location ID'])['Amount'].sum().reset_index()
+    if len(duplicate_check) == len(df):
+        return entries
+    logger.warning("Found multiple entries for same Badge ID, Department, and Pay Code. Consolidating...")
+    return PayrollBatch(duplicate_check[PAYROLL_COLUMNS])
+
+def normalize_dept_code(dept) -> str:
+    """Department code without surrounding spaces or leading zeros, for comparing codes."""
+    try:
+        return str(int(str(dept).strip()))
+    except (ValueError, TypeError):
+        return str(dept).strip()
+
+def net_negative_spiffs(entries: PayrollBatch, neg_df: pd.DataFrame,
+                        logger: logging.Logger) -> Tuple[PayrollBatch, pd.DataFrame]:
+    """Subtract each technician's consolidated negative spiffs from their PCM entry.
+
+    neg_df comes from process_adjustments and entries should already be consolidated.
+    Negatives are matched to PCM entries on (badge, home department) in one merge. A
+    negative is netted only if the PCM amount stays positive, and each PCM entry takes
+    at most one negative. Returns the netted entries and the negatives left for
+    negative_adjustments.xlsx.
+    """
+    unmatched_columns = ['Technician', 'Badge ID', 'Service Department', 'Amount', 'Type', 'Memo']
+    if neg_df.empty:
+        return entries, pd.DataFrame(columns=unmatched_columns)
+
+    payroll = entries.frame
+    pcm_rows = payroll[payroll['Pay Code'] == 'PCM']
+    pcm = pd.DataFrame({
+        'badge': pcm_rows['Badge ID'].map(format_badge_id),
+        'dept': pcm_rows['Dept'].map(normalize_dept_code),
+        'pcm_row': pcm_rows.index,
+        'current_amount': pcm_rows['Amount'],
+    }).drop_duplicates(['badge', 'dept'])
+    negatives = pd.DataFrame({
+        'Technician': neg_df['Technician'],
+        'badge': neg_df['Badge ID'].map(format_badge_id),
+        'Service Department': neg_df['Service Department'],
+        'dept': neg_df['Service Department'].map(normalize_dept_code),
+        'total_negative': neg_df['Amount'].astype(float).abs(),
+    })
+    matched = negatives.merge(pcm, on=['badge', 'dept'], how='left')
+    matched['new_amount'] = matched['current_amount'] - matched['total_negative']
+
+    # A PCM entry takes the first negative that leaves it positive
+    nets = matched['new_amount'] > 0
+    nets &= ~matched['pcm_row'].where(nets).duplicated()
+    netted = matched[nets]
+
+    payroll = payroll.copy()
+    payroll.loc[netted['pcm_row'].astype(int).to_numpy(), 'Amount'] = netted['new_amount'].to_numpy()
+    if logger.isEnabledFor(logging.DEBUG):
+        for row in netted.itertuples(index=False):
+            logger.debug(f"Updated PCM entry for Badge ID {row.badge} dept {row.dept}: "
+                         f"${row.current_amount:,.2f} - ${row.total_negative:,.2f} = ${row.new_amount:,.2f}")
+    logger.info(f"Updated {len(netted)} PCM entries with negative spiffs")
+
+    leftover = matched[~nets]
+    unmatched = pd.DataFrame({
+        'Technician': leftover['Technician'],
+        'Badge ID': leftover['badge'],
+        'Service Department': leftover['Service Department'],
+        'Amount': -leftover['total_negative'],
+        'Type': 'Consolidated Negative',
+        'Memo': [f"No matching PCM entry found for total negative spiffs of ${total:,.2f}"
+                 for total in leftover['total_negative']],
+    }, columns=unmatched_columns).reset_index(drop=True)
+    return PayrollBatch(payroll), unmatched
+
+def save_payroll_file(entries: PayrollBatch, output_file: str, logger: logging.Logger, outputs: OutputStage):
     """Save payroll entries to Excel file with specific formatting and validation."""
     try:
-        # Define standard column order
-        PAYROLL_COLUMNS = [
-            'Company Code', 'Badge ID', 'Date', 'Amount', 
-            'Pay Code', 'Dept', 'Location ID'
-        ]
-        
-        # Convert entries to DataFrame
-        df = pd.DataFrame([{
-            'Company Code': entry.company_code,
-            'Badge ID': entry.badge_id,
-            'Date': entry.date,
-            'Amount': entry.amount,
-            'Pay Code': entry.pay_code,
-            'Dept': entry.dept,
-            'Location ID': entry.location_id
-        } for entry in entries])
-        
-        # Group entries by Badge ID, Department, and Pay Code
-        duplicate_check = df.groupby(['Badge ID', 'Dept', 'Pay Code', 'Company Code', 'Date', 'Location ID'])['Amount'].sum().reset_index()
-        if len(duplicate_check) != len(df):
-            logger.warning("Found multiple entries for same Badge ID, Department, and Pay Code. Consolidating...")
-            df = duplicate_check
+        if not isinstance(entries, PayrollBatch):
+            entries = PayrollBatch.from_entries(entries)
+        df = consolidate_payroll_entries(entries, logger).frame
         
         # Sort entries and ensure column order
         df = df[PAYROLL_COLUMNS].sort_values(['Badge ID', 'Pay Code'])
         
-        # Validate entries
-        for idx, row in df.iterrows():
-            try:
-                # Ensure amount is positive
-                if row['Amount'] <= 0:
-                    logger.warning(f"Invalid amount ${row['Amount']} for Badge ID {row['Badge ID']}")
-                    continue
-                    
-                # Validate Pay Code
-                if row['Pay Code'] not in ['PCM', 'ICM', 'SPF']:
-                    logger.warning(f"Invalid Pay Code {row['Pay Code']} for Badge ID {row['Badge ID']}")
-                    continue
-                    
-                # Validate Department code
-                if str(row['Dept']) not in [dept['code'] for dept in DEPARTMENT_CODES.values()]:
-                    logger.warning(f"Invalid Department code {row['Dept']} for Badge ID {row['Badge ID']}")
-                    continue
-                
-            except Exception as e:
-                logger.error(f"Error validating row {idx}: {str(e)}")
-                continue
+        # Validate entries: report the first problem of each row
+        bad_amount = ~(df['Amount'] > 0)
+        bad_pay_code = ~bad_amount & ~df['Pay Code'].isin(VALID_PAY_CODES)
+        bad_dept = ~bad_amount & ~bad_pay_code & ~df['Dept'].astype(str).isin(
+            [dept['code'] for dept in DEPARTMENT_CODES.values()]
+        )
+        flagged = df[bad_amount | bad_pay_code | bad_dept]
+        for idx, badge_id, amount, pay_code, dept in zip(flagged.index, flagged['Badge ID'], flagged['Amount'],
+                                                         flagged['Pay Code'], flagged['Dept']):
+            if bad_amount[idx]:
+                logger.warning(f"Invalid amount ${amount} for Badge ID {badge_id}")
+            elif bad_pay_code[idx]:
+                logger.warning(f"Invalid Pay Code {pay_code} for Badge ID {badge_id}")
+            else:
+                logger.warning(f"Invalid Department code {dept} for Badge ID {badge_id}")
         
         # Write to Excel with formatting
-        with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False)
-            worksheet = writer.sheets['Sheet1']
-            
-            # Format columns
-            for idx, col in enumerate(df.columns):
-                max_length = max(
-                    df[col].astype(str).apply(len).max(),
-                    len(str(col))
-                ) + 2
-                
-                col_letter = get_column_letter(idx + 1)
-                worksheet.column_dimensions[col_letter].width = max_length
-                
-                header_cell = worksheet[f"{col_letter}1"]
-                header_cell.font = Font(bold=True)
-                
-                # Special formatting for Amount column
-                if col == 'Amount':
-                    for cell in worksheet[col_letter]:
-                        cell.alignment = Alignment(horizontal='right')
-                        if cell.row > 1:  # Skip header
-                            cell.number_format = '#,##0.00'
-                
-                # Center align other columns
-                else:
-                    for cell in worksheet[col_letter]:
-                        cell.alignment = Alignment(horizontal='center')
+        outputs.add(output_file, {'Sheet1': df}, style='payroll')
         
-        logger.info(f"Successfully saved {len(df)} payroll entries to {output_file}")
+        logger.info(f"Queued {len(df)} payroll entries for {output_file}")
         logger.debug("Entry breakdown:")
         logger.debug(f"PCM (Service Tech Commission): {len(df[df['Pay Code'] == 'PCM'])}")
         logger.debug(f"ICM (Installer GP): {len(df[df['Pay Code'] == 'ICM'])}")
@@ -2092,107 +2787,21 @@ def save_payroll_file(entries: List[PayrollEntry], output_file: str, logger: log
         raise
 
 def save_adjustment_files(tgl_df: pd.DataFrame, matched_df: pd.DataFrame, 
-                        pos_df: pd.DataFrame, neg_df: pd.DataFrame,
+                        pos_df: pd.DataFrame, unmatched_negatives: pd.DataFrame,
                         matched_file: str, pos_file: str, 
                         neg_file: str, tech_data: pd.DataFrame,
-                        base_date: datetime, logger: logging.Logger):
-    """Save adjustment files."""
+                        base_date: datetime, logger: logging.Logger, outputs: OutputStage):
+    """Save adjustment files.
+
+    unmatched_negatives holds the negative spiffs net_negative_spiffs could not
+    subtract from a PCM entry.
+    """
     try:
         # Calculate week end date for entries
         start_of_week = base_date - timedelta(days=base_date.weekday())
         week_end_date = start_of_week + timedelta(days=6)
         target_date = week_end_date.strftime('%m/%d/%Y')
         
-        # Initialize lists for tracking entries
-        payroll_entries = []
-        final_negative_entries = []
-        
-        # Read PCM entries from payroll file first
-        payroll_file = os.path.join(os.path.dirname(matched_file), 'payroll.xlsx')
-        try:
-            all_payroll_entries = pd.read_excel(payroll_file, dtype={'Badge ID': str})
-            # Filter for PCM entries only for processing negatives
-            pcm_df = all_payroll_entries[all_payroll_entries['Pay Code'] == 'PCM'].copy()
-            # Ensure Badge ID is properly formatted with THREE leading zeros
-            pcm_df['Badge ID'] = pcm_df['Badge ID'].apply(format_badge_id)
-        except Exception as e:
-            logger.error(f"Error reading payroll file: {str(e)}")
-            all_payroll_entries = pd.DataFrame()
-            pcm_df = pd.DataFrame()
-        
-        # Helper function to normalize department codes (for comparison only)
-        def normalize_dept(dept):
-            try:
-                # Convert to string, remove any leading/trailing spaces and leading zeros
-                return str(int(str(dept).strip()))
-            except (ValueError, TypeError):
-                return str(dept).strip()
-        
-        # Process each tech's total negative against their PCM entry first
-        updated_pcm_entries = []
-        
-        for _, neg_row in neg_df.iterrows():
-            try:
-                tech_badge_id = format_badge_id(neg_row['Badge ID'])
-                home_dept = neg_row['Service Department']
-                total_negative = abs(float(str(neg_row['Amount']).replace('$', '').replace(',', '')))
-                
-                # Look for PCM entry with matching badge ID and department
-                if not pcm_df.empty:
-                    # Create temporary normalized columns for comparison
-                    normalized_home_dept = normalize_dept(home_dept)
-                    temp_normalized = pcm_df['Dept'].apply(normalize_dept)
-                    
-                    # Debug logging
-                    logger.debug(f"\nProcessing Badge ID: {tech_badge_id}")
-                    logger.debug(f"Looking for department: {normalized_home_dept}")
-                    logger.debug(f"Available PCM departments: {pcm_df['Dept'].tolist()}")
-                    logger.debug(f"Normalized PCM departments: {temp_normalized.tolist()}")
-                    
-                    # Find matching entries using normalized departments
-                    pcm_entries = pcm_df[
-                        (pcm_df['Badge ID'] == tech_badge_id) &
-                        (temp_normalized == normalized_home_dept)
-                    ]
-                    
-                    logger.debug(f"Found matching PCM entries: {len(pcm_entries)}")
-                    if not pcm_entries.empty:
-                        logger.debug(f"PCM entries found:\n{pcm_entries}")
-                    
-                    if not pcm_entries.empty:
-                        # Get the PCM amount
-                        current_amount = float(str(pcm_entries.iloc[0]['Amount']).replace('$', '').replace(',', ''))
-                        new_amount = current_amount - total_negative
-                        
-                        logger.debug(f"Current PCM amount: ${current_amount:,.2f}")
-                        logger.debug(f"Negative amount to subtract: ${total_negative:,.2f}")
-                        logger.debug(f"New amount after subtraction: ${new_amount:,.2f}")
-                        
-                        if new_amount > 0:
-                            # Create updated PCM entry
-                            updated_entry = pcm_entries.iloc[0].copy()
-                            updated_entry['Amount'] = new_amount
-                            updated_pcm_entries.append(updated_entry)
-                            logger.debug(f"Updated PCM entry for Badge ID {tech_badge_id}: ${current_amount:,.2f} - ${total_negative:,.2f} = ${new_amount:,.2f}")
-                            
-                            # Remove this entry from pcm_df to prevent double processing
-                            pcm_df = pcm_df.drop(pcm_entries.index)
-                            continue  # Skip adding to final_negative_entries since we handled it
-                    
-                    # If we get here, either no PCM entry was found or new_amount <= 0
-                    final_negative_entries.append({
-                        'Technician': neg_row['Technician'],
-                        'Badge ID': tech_badge_id,  # Already formatted with THREE leading zeros
-                        'Service Department': home_dept,
-                        'Amount': -total_negative,
-                        'Type': 'Consolidated Negative',
-                        'Memo': f"No matching PCM entry found for total negative spiffs of ${total_negative:,.2f}"
-                    })
-                
-            except Exception as e:
-                logger.warning(f"Error processing negative adjustment: {str(e)}")
-                continue
-        
         # Consolidate spiffs by Badge ID and Department
         spiff_groups = {}  # (badge_id, dept) -> total_amount
         
@@ -2206,7 +2815,7 @@ def save_adjustment_files(tgl_df: pd.DataFrame, matched_df: pd.DataFrame,
                 continue
             
             try:
-                amount = float(str(row['Amount']).replace('$', '').replace(',', ''))
+                amount = float(row['Amount'])
                 badge_id = format_badge_id(row['Badge ID'])
                 dept = row['Service Department']
                 
@@ -2227,7 +2836,7 @@ def save_adjustment_files(tgl_df: pd.DataFrame, matched_df: pd.DataFrame,
                 continue
                 
             try:
-                amount = float(str(row['Amount']).replace('$', '').replace(',', ''))
+                amount = float(row['Amount'])
                 badge_id = format_badge_id(row['Badge ID'])
                 dept = row['Service Department']
                 
@@ -2238,100 +2847,37 @@ def save_adjustment_files(tgl_df: pd.DataFrame, matched_df: pd.DataFrame,
                 logger.warning(f"Error processing positive spiff for {tech_name}: {str(e)}")
                 continue
         
-        # Convert consolidated spiffs to payroll entries
-        for (badge_id, dept), amount in spiff_groups.items():
-            payroll_entries.append({
-                'Company Code': COMPANY_CODE,
-                'Badge ID': badge_id,  # Already formatted
-                'Date': target_date,
-                'Amount': amount,
-                'Pay Code': 'SPF',
-                'Dept': dept,
-                'Location ID': LOCATION_ID
-            })
-        
-        # Update the payroll file with modified PCM entries
-        if updated_pcm_entries:
-            updated_pcm_df = pd.DataFrame(updated_pcm_entries)
-            
-            # Remove old PCM entries that were updated
-            for _, updated_entry in updated_pcm_df.iterrows():
-                mask = (
-                    (all_payroll_entries['Badge ID'] == updated_entry['Badge ID']) &
-                    (all_payroll_entries['Pay Code'] == 'PCM') &
-                    (all_payroll_entries['Dept'] == updated_entry['Dept'])
-                )
-                all_payroll_entries = all_payroll_entries[~mask]
-            
-            # Add updated PCM entries
-            all_payroll_entries = pd.concat([all_payroll_entries, updated_pcm_df], ignore_index=True)
-            
-            # Save back to payroll file
-            all_payroll_entries = all_payroll_entries.sort_values(['Badge ID', 'Pay Code'])
-            with pd.ExcelWriter(payroll_file, engine='openpyxl') as writer:
-                all_payroll_entries.to_excel(writer, index=False)
-                autofit_columns(writer.sheets['Sheet1'])
-            
-            logger.info(f"Updated {len(updated_pcm_entries)} PCM entries in payroll file")
+        # Convert consolidated spiffs to payroll entries (badge IDs already formatted)
+        spiff_entries = PayrollBatch.from_columns(
+            [badge_id for badge_id, _ in spiff_groups],
+            list(spiff_groups.values()),
+            [dept for _, dept in spiff_groups],
+            pay_code='SPF', date=target_date
+        )
         
-        # Convert payroll entries to DataFrame
-        payroll_df = pd.DataFrame(payroll_entries)
+        payroll_df = spiff_entries.frame
         
         # Save spiffs file
         if not payroll_df.empty:
             payroll_df = payroll_df.sort_values(['Badge ID', 'Dept'])
-            
-            with pd.ExcelWriter(matched_file, engine='openpyxl') as writer:
-                payroll_df.to_excel(writer, index=False)
-                worksheet = writer.sheets['Sheet1']
-                
-                for idx, col in enumerate(payroll_df.columns):
-                    max_length = max(
-                        payroll_df[col].astype(str).apply(len).max(),
-                        len(str(col))
-                    ) + 2
-                    
-                    col_letter = get_column_letter(idx + 1)
-                    worksheet.column_dimensions[col_letter].width = max_length
-                    
-                    header_cell = worksheet[f"{col_letter}1"]
-                    header_cell.font = Font(bold=True)
-                    
-                    if col == 'Amount':
-                        for cell in worksheet[col_letter]:
-                            cell.alignment = Alignment(horizontal='right')
-                            if cell.row > 1:
-                                cell.number_format = '#,##0.00'
-                    else:
-                        for cell in worksheet[col_letter]:
-                            cell.alignment = Alignment(horizontal='center')
+            outputs.add(matched_file, {'Sheet1': payroll_df}, style='payroll')
         else:
-            empty_df = pd.DataFrame(columns=[
-                'Company Code', 'Badge ID', 'Date', 'Amount', 
-                'Pay Code', 'Dept', 'Location ID'
-            ])
-            with pd.ExcelWriter(matched_file, engine='openpyxl') as writer:
-                empty_df.to_excel(writer, index=False)
-                autofit_columns(writer.sheets['Sheet1'])
+            outputs.add(matched_file, {'Sheet1': pd.DataFrame(columns=PAYROLL_COLUMNS)})
         
         # Save reference files
         pos_reference_df = matched_df.copy()
         pos_reference_df['Processing Date'] = target_date
         
-        with pd.ExcelWriter(pos_file, engine='openpyxl') as writer:
-            pos_reference_df.to_excel(writer, index=False)
-            autofit_columns(writer.sheets['Sheet1'])
+        outputs.add(pos_file, {'Sheet1': pos_reference_df})
         
         # Save negative adjustments
-        neg_reference_df = pd.DataFrame(final_negative_entries)
+        neg_reference_df = unmatched_negatives.copy()
         if not neg_reference_df.empty:
             neg_reference_df['Processing Date'] = target_date
         
-        with pd.ExcelWriter(neg_file, engine='openpyxl') as writer:
-            neg_reference_df.to_excel(writer, index=False)
-            autofit_columns(writer.sheets['Sheet1'])
+        outputs.add(neg_file, {'Sheet1': neg_reference_df})
         
-        logger.info(f"Successfully saved adjustment files:")
+        logger.info(f"Queued adjustment files:")
         logger.info(f"  Payroll entries: {len(payroll_df) if not payroll_df.empty else 0}")
         logger.info(f"  Positive reference entries: {len(pos_reference_df)}")
         logger.info(f"  Negative reference entries: {len(neg_reference_df)}")
@@ -2408,35 +2954,141 @@ NAME_COLUMNS_MAP = {
     'Sheet1_Tech': ['Name']
 }
 
-def combine_workbooks(directory, output_file, files):
-    """Combine all workbooks into a single file using the pre-selected files."""
-    def clean_name_column(worksheet, col_idx):
-        """Helper function to clean names in a specific column."""
-        for row in worksheet.iter_rows(min_row=2):  # Skip header
-            cell = row[col_idx-1]  # Convert to 0-based index
-            if cell.value and isinstance(cell.value, str):
-                original = cell.value
-                cleaned = original.strip()
-                if original != cleaned:
-                    print(f"Cleaned name: '{original}' -> '{cleaned}'")
-                cell.value = cleaned
+_file_hashes = {}
+
+def get_file_hash(file_path: str) -> str:
+    """Return the SHA-256 of a file's content, memoized by path, mtime and size."""
+    stat = os.stat(file_path)
+    memo_key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+    if memo_key not in _file_hashes:
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        _file_hashes[memo_key] = digest.hexdigest()
+    return _file_hashes[memo_key]
+
+def evict_sheet_cache(cache_dir: str, max_bytes: int):
+    """Remove least recently used cache entries until the cache fits in max_bytes."""
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith('.pkl'):
+            try:
+                stat = os.stat(os.path.join(cache_dir, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(os.path.join(cache_dir, name))
+        except FileNotFoundError:
+            pass  # Already evicted by a concurrent parse
+        total -= size
+        logger.debug(f"Evicted sheet cache entry {name} ({size:,} bytes)")
 
-    # Copy the UUID file as the base
-    shutil.copy2(files['uuid'], output_file)
-    target_wb = load_workbook(filename=output_file)
+def read_excel_typed(file_path: str, sheet_name=0, schema: Optional[str] = None, **kwargs):
+    """pd.read_excel projected and typed by a SHEET_SCHEMAS entry.
 
-    # Process the UUID file sheets first
-    for sheet_name in target_wb.sheetnames:
-        sheet = target_wb[sheet_name]
-        header_row = next(sheet.rows)
-        
-        # Find Technician columns
-        for idx, cell in enumerate(header_row, 1):
-            if cell.value == 'Technician':
-                clean_name_column(sheet, idx)
-        autofit_columns(sheet)
+    With sheet_name=None every sheet is read, typed by the given schema or else
+    by the schema registered under the sheet's own name.
+    """
+    if sheet_name is not None:
+        parsed = pd.read_excel(file_path, sheet_name=sheet_name, **schema_read_options(schema), **kwargs)
+        return apply_sheet_schema(parsed, schema)
+
+    sheets = {}
+    with pd.ExcelFile(file_path) as workbook:
+        for name in workbook.sheet_names:
+            sheet_schema = schema or name
+            parsed = workbook.parse(name, **schema_read_options(sheet_schema), **kwargs)
+            sheets[name] = apply_sheet_schema(parsed, sheet_schema)
+    return sheets
+
+def load_cached(file_path: str, key: str, build):
+    """Return build() for a file, cached on disk by the file's content hash and key."""
+    if not SHEET_CACHE_DIR:
+        return build()
+
+    cache_file = None
+    try:
+        key_source = f"{get_file_hash(file_path)}|{key}"
+        cache_file = os.path.join(SHEET_CACHE_DIR, hashlib.sha256(key_source.encode()).hexdigest() + '.pkl')
+        if os.path.exists(cache_file):
+            cached = pd.read_pickle(cache_file)
+            os.utime(cache_file)  # Mark as recently used for eviction
+            logger.debug(f"Sheet cache hit for {os.path.basename(file_path)} [{key}]")
+            return cached
+    except Exception as e:
+        logger.warning(f"Could not read sheet cache for {file_path}: {str(e)}")
+
+    parsed = build()
+
+    if cache_file:
+        try:
+            os.makedirs(SHEET_CACHE_DIR, exist_ok=True)
+            temp_file = f"{cache_file}.{os.getpid()}.tmp"
+            pd.to_pickle(parsed, temp_file)
+            os.replace(temp_file, cache_file)
+            evict_sheet_cache(SHEET_CACHE_DIR, SHEET_CACHE_MAX_BYTES)
+        except Exception as e:
+            logger.warning(f"Could not write sheet cache for {file_path}: {str(e)}")
+    return parsed
+
+def read_excel_cached(file_path: str, sheet_name=0, schema: Optional[str] = None, **kwargs):
+    """read_excel_typed backed by a content-hashed cache of the parsed, typed sheets.
+
+    The key covers the file's content hash, the sheet name, the schemas and the
+    read options, so a rerun with unchanged inputs skips Excel parsing entirely.
+    """
+    key = f"{sheet_name!r}|{schema!r}|{SHEET_SCHEMAS!r}|{sorted(kwargs.items())!r}"
+    return load_cached(file_path, key,
+                       lambda: read_excel_typed(file_path, sheet_name=sheet_name, schema=schema, **kwargs))
+
+def combine_workbooks(directory, output_file, files, report_cleaned: bool = True):
+    """Combine all workbooks into a single file using the pre-selected files.
+
+    Sources are opened read-only and the target is write-only, so rows stream
+    through one at a time and memory stays flat whatever the row count.
+    """
+    def clean_row(row, name_col_indices):
+        """Helper function to clean names in the given columns of a row."""
+        row = list(row)
+        for idx in name_col_indices:
+            if idx < len(row) and isinstance(row[idx], str):
+                original = row[idx]
+                cleaned = original.strip()
+                if original != cleaned and report_cleaned:
+                    print(f"Cleaned name: '{original}' -> '{cleaned}'")
+                row[idx] = cleaned
+        return row
+
+    def stream_sheet(source_ws, target_wb, target_sheet, name_cols):
+        """Copy one sheet row by row, cleaning name columns as they pass."""
+        source_ws.reset_dimensions()
+        target_ws = target_wb.create_sheet(target_sheet)
+        rows = source_ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        name_col_indices = [idx for idx, value in enumerate(header) if value in name_cols]
+
+        # Column widths must be set before the first write, so size them from a bounded sample
+        sample = [list(header)] + [clean_row(row, name_col_indices) for row in islice(rows, AUTOFIT_SAMPLE_ROWS)]
+        widths = defaultdict(int)
+        for row in sample:
+            for idx, value in enumerate(row):
+                widths[idx] = max(widths[idx], len(str(value)))
+        for idx, width in widths.items():
+            target_ws.column_dimensions[get_column_letter(idx + 1)].width = width + 2
+
+        for row in sample:
+            target_ws.append(row)
+        for row in rows:
+            target_ws.append(clean_row(row, name_col_indices))
 
-    # Process other workbooks
     source_configs = [
         {
             'file': files['jobs'],
@@ -2460,45 +3112,133 @@ def combine_workbooks(directory, output_file, files):
             'name_cols': ['Lead Generated By']
         })
 
+    target_wb = Workbook(write_only=True)
+    replaced_sheets = {config['target_sheet'] for config in source_configs}
+
+    # The UUID file sheets come first, with their Technician columns cleaned
+    uuid_wb = load_workbook(filename=files['uuid'], read_only=True, data_only=True)
+    try:
+        for sheet_name in uuid_wb.sheetnames:
+            if sheet_name not in replaced_sheets:
+                stream_sheet(uuid_wb[sheet_name], target_wb, sheet_name, ['Technician'])
+    finally:
+        uuid_wb.close()
+
+    # Process other workbooks
     for config in source_configs:
-        source_wb = load_workbook(filename=config['file'], data_only=True)
-        source_ws = source_wb[config['source_sheet']]
-
-        # Create or replace target sheet
-        if config['target_sheet'] in target_wb.sheetnames:
-            target_wb.remove(target_wb[config['target_sheet']])
-        target_ws = target_wb.create_sheet(config['target_sheet'])
-
-        # Find columns that need cleaning
-        name_col_indices = []
-        header_row = next(source_ws.rows)
-        for idx, cell in enumerate(header_row, 1):
-            if cell.value in config['name_cols']:
-                name_col_indices.append(idx)
-
-        # Copy data and clean name columns
-        for row in source_ws.rows:
-            row_data = []
-            for cell in row:
-                value = cell.value
-                if cell.row > 1 and cell.column in name_col_indices and isinstance(value, str):
-                    original = value
-                    value = value.strip()
-                    if original != value:
-                        print(f"Cleaned name: '{original}' -> '{value}'")
-                target_ws.cell(row=cell.row, column=cell.column, value=value)
-
-        autofit_columns(target_ws)
+        source_wb = load_workbook(filename=config['file'], read_only=True, data_only=True)
+        try:
+            stream_sheet(source_wb[config['source_sheet']], target_wb,
+                         config['target_sheet'], config['name_cols'])
+        finally:
+            source_wb.close()
 
     target_wb.save(output_file)
 
+def write_combined_audit(path: str, files) -> Tuple[float, int]:
+    """Stream the audit copy combined_data.xlsx from the source files, every column kept.
+
+    The names were already reported when the snapshot was cleaned. Returns (seconds, bytes).
+    """
+    started = time.perf_counter()
+    combine_workbooks(os.path.dirname(path), path, files, report_cleaned=False)
+    return time.perf_counter() - started, os.path.getsize(path)
+
+def clean_name_values(values: pd.Series) -> pd.Series:
+    """Strip whitespace from the string values of a name column, leaving other values untouched."""
+    is_text = values.map(lambda value: isinstance(value, str))
+    if not is_text.any():
+        return values
+    originals = values[is_text]
+    cleaned = originals.str.strip()
+    for original, value in zip(originals[originals != cleaned], cleaned[originals != cleaned]):
+        print(f"Cleaned name: '{original}' -> '{value}'")
+    values = values.copy()
+    # Blank names come back as empty cells, the same as after an Excel round trip
+    values[is_text] = cleaned.where(cleaned != '')
+    return values
+
+def parse_input_workbooks(files, logger: logging.Logger) -> dict:
+    """Parse the input workbooks concurrently in a process pool.
+
+    The files are independent, so wall time is bounded by the largest one
+    (normally the Jobs Report) rather than the sum of all of them.
+    """
+    reads = {
+        'uuid': (read_excel_cached, files['uuid'], {'sheet_name': None}),
+        'jobs': (read_excel_cached, files['jobs'], {'sheet_name': 'Sheet1', 'schema': SNAPSHOT_SHEETS['jobs']}),
+        'tech': (read_excel_cached, files['tech'], {'sheet_name': 'Sheet1', 'schema': SNAPSHOT_SHEETS['tech']})
+    }
+    if files.get('tgl'):
+        reads['tgl'] = (read_excel_cached, files['tgl'], {'sheet_name': 'Sheet1', 'schema': SNAPSHOT_SHEETS['tgl']})
+    if files.get('time_off'):
+        reads['time_off'] = (load_time_off_index, files['time_off'], {})
+
+    def collect(key, get_result):
+        try:
+            parsed[key] = get_result()
+        except Exception as e:
+            if key != 'time_off':
+                raise
+            # Leave time off to get_excused_hours, which reports the problem itself
+            logger.warning(f"Could not build time off index: {str(e)}")
+
+    parsed = {}
+    workers = min(PARSE_WORKERS, len(reads))
+    if workers <= 1:
+        for key, (read, path, options) in reads.items():
+            collect(key, lambda: read(path, **options))
+        return parsed
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {key: pool.submit(read, path, **options) for key, (read, path, options) in reads.items()}
+        for key, future in futures.items():
+            collect(key, future.result)
+    logger.debug(f"Parsed {len(parsed)} input workbooks with {workers} worker processes")
+    return parsed
+
+def combine_workbooks_in_memory(files, logger: logging.Logger) -> WeekSnapshot:
+    """Build the week snapshot directly from the pre-selected files, without combined_data.xlsx."""
+    parsed = parse_input_workbooks(files, logger)
+
+    def clean_sheet(df, name_cols):
+        for col in df.columns:
+            if col in name_cols:
+                df[col] = clean_name_values(df[col])
+        return df
+
+    # The UUID file contributes all of its sheets, as when it was copied as the base
+    uuid_sheets = parsed['uuid']
+    for df in uuid_sheets.values():
+        clean_sheet(df, ['Technician'])
+
+    jobs = clean_sheet(parsed['jobs'], ['Sold By', 'Primary Technician', 'Technician'])
+    tech = clean_sheet(parsed['tech'], ['Name'])
+    tgl = clean_sheet(parsed['tgl'], ['Lead Generated By']) if 'tgl' in parsed else pd.DataFrame()
+
+    def uuid_sheet(sheet_name):
+        if sheet_name not in uuid_sheets:
+            logger.warning(f"Sheet '{sheet_name}' not found in {files['uuid']}, using an empty frame")
+            return pd.DataFrame()
+        return uuid_sheets[sheet_name]
+
+    logger.debug(f"Combined in memory: {len(jobs)} jobs, {len(tech)} technicians, {len(tgl)} TGLs")
+    return WeekSnapshot(
+        jobs=jobs,
+        tech=tech,
+        tgl=tgl,
+        invoices=uuid_sheet(SNAPSHOT_SHEETS['invoices']),
+        adjustments=uuid_sheet(SNAPSHOT_SHEETS['adjustments']),
+        time_off=parsed.get('time_off')
+    )
+
 def process_department_entries(tech_group: pd.DataFrame) -> Dict[str, Dict[str, float]]:
     """Process all entries for a technician by department, properly summing all positives and negatives."""
     dept_totals = defaultdict(lambda: {'positives': 0.0, 'negatives': 0.0})
     
     for _, row in tech_group.iterrows():
         try:
-            amount = float(str(row['Amount']).replace('$', '').replace(',', ''))
+            amount = float(row['Amount'])
             memo = str(row['Memo']).strip()
             
             # Skip TGLs
@@ -2522,49 +3262,51 @@ def process_department_entries(tech_group: pd.DataFrame) -> Dict[str, Dict[str,
     return dept_totals
 
 def process_calculations(base_path: str, output_dir: str, logger: logging.Logger,
-                         start_of_week: datetime, end_of_week: datetime):
-    """Process all calculations and generate output files."""
+                         start_of_week: datetime, end_of_week: datetime,
+                         snapshot: WeekSnapshot, outputs: OutputStage) -> pd.DataFrame:
+    """Process all calculations, queue paystats.xlsx and return the numeric paystats frame."""
     try:
-        combined_file = os.path.join(output_dir, 'combined_data.xlsx')
         paystats_file = os.path.join(output_dir, 'paystats.xlsx')
 
-        # Read necessary data
-        data = pd.read_excel(combined_file, sheet_name='Sheet1')
-        tech_data = read_tech_department_data(combined_file, logger)
+        # Only the jobs invoiced in the selected week reach the calculations
+        data = snapshot.jobs_in_week(start_of_week)
+        skipped_jobs = len(snapshot.jobs) - len(data)
+        if skipped_jobs > 0:
+            logger.info(f"Note: {skipped_jobs} jobs were skipped because they did not fall within the selected week")
+        tech_data = read_tech_department_data(snapshot, logger)
 
         # Filter tech_data to only include service technicians
         service_tech_data = tech_data[
-            tech_data['Technician Business Unit'].apply(
-                lambda x: determine_tech_type(x) == 'SERVICE'
-            )
+            business_unit_field(tech_data['Technician Business Unit'], 'Tech Type') == 'SERVICE'
         ]
 
         # Use original time off file instead of combined file
         time_off_file = os.path.join(base_path, "Approved_Time_Off 2023.xlsx")
-        excused_hours_dict = get_excused_hours(time_off_file, start_of_week)
+        excused_hours_dict = get_excused_hours(time_off_file, start_of_week, time_off_index=snapshot.time_off)
 
         # Calculate commission results for service technicians only
         results_df = process_commission_calculations(
-            data, service_tech_data, combined_file, start_of_week, excused_hours_dict
+            data, service_tech_data, snapshot, start_of_week, excused_hours_dict
         )
 
         # Save results to paystats file
-        with pd.ExcelWriter(paystats_file, engine='openpyxl') as writer:
-            results_df.to_excel(writer, sheet_name='Technician Revenue Totals', index=False)
-            autofit_columns(writer.sheets['Technician Revenue Totals'])
+        outputs.add(paystats_file, {'Technician Revenue Totals': format_paystats(results_df)})
 
         logger.info("Commission calculations completed for service technicians")
+        return results_df
 
     except Exception as e:
         logger.error(f"Error in calculations: {str(e)}")
         raise
 
-def process_payroll(base_path: str, output_dir: str, base_date: datetime, logger: logging.Logger, tech_data: pd.DataFrame):
-    """Process payroll and adjustments, separating service tech and installer processing."""
+def process_payroll(base_path: str, output_dir: str, base_date: datetime, logger: logging.Logger, tech_data: pd.DataFrame,
+                    snapshot: WeekSnapshot, paystats: pd.DataFrame, outputs: OutputStage):
+    """Process payroll and adjustments, separating service tech and installer processing.
+
+    The output files are queued on outputs; the caller commits them.
+    """
     try:
         # Define file paths
-        combined_file = os.path.join(output_dir, 'combined_data.xlsx')
-        paystats_file = os.path.join(output_dir, 'paystats.xlsx')
         payroll_file = os.path.join(output_dir, 'payroll.xlsx')
         matched_file = os.path.join(output_dir, 'Spiffs.xlsx')
         adj_pos_file = os.path.join(output_dir, 'positive_adjustments.xlsx')
@@ -2574,32 +3316,34 @@ def process_payroll(base_path: str, output_dir: str, base_date: datetime, logger
         target_date = base_date.strftime('%m/%d/%Y')
         
         # Split technicians by type
-        service_techs = tech_data[tech_data['Technician Business Unit'].apply(
-            lambda x: determine_tech_type(x) == 'SERVICE'
-        )]
-        install_techs = tech_data[tech_data['Technician Business Unit'].apply(
-            lambda x: determine_tech_type(x) == 'INSTALL'
-        )]
+        tech_types = business_unit_field(tech_data['Technician Business Unit'], 'Tech Type')
+        service_techs = tech_data[tech_types == 'SERVICE']
+        install_techs = tech_data[tech_types == 'INSTALL']
         
         logger.info(f"Processing {len(service_techs)} service technicians and {len(install_techs)} installers")
         
         # Process service technician commissions
-        payroll_entries = process_paystats(output_dir, paystats_file, service_techs, target_date, logger)
+        payroll_entries = process_paystats(snapshot, paystats, service_techs, target_date, logger)
         
         # Process installer GP entries separately
-        gp_entries = process_gp_entries(output_dir, install_techs, target_date, logger)
+        gp_entries = process_gp_entries(snapshot, install_techs, target_date, logger)
         
         # Combine payroll entries
-        all_payroll_entries = payroll_entries + gp_entries
+        all_payroll_entries = PayrollBatch.concat([payroll_entries, gp_entries])
         
         # Process adjustments (TGLs and spiffs) for both service techs and installers
         eligible_techs = pd.concat([service_techs, install_techs])
-        tgl_df, matched_df, pos_df, neg_df = process_adjustments(combined_file, logger, eligible_techs)
+        tgl_df, matched_df, pos_df, neg_df = process_adjustments(snapshot, logger)
         
+        # Net negative spiffs against the PCM entries before payroll.xlsx is written
+        netted_entries, unmatched_negatives = net_negative_spiffs(
+            consolidate_payroll_entries(all_payroll_entries, logger), neg_df, logger
+        )
+
         # Save output files
-        save_payroll_file(all_payroll_entries, payroll_file, logger)
-        save_adjustment_files(tgl_df, matched_df, pos_df, neg_df, matched_file, 
-                            adj_pos_file, adj_neg_file, tech_data, base_date, logger)
+        save_payroll_file(netted_entries, payroll_file, logger, outputs)
+        save_adjustment_files(tgl_df, matched_df, pos_df, unmatched_negatives, matched_file, 
+                            adj_pos_file, adj_neg_file, tech_data, base_date, logger, outputs)
         
         logger.info("Payroll processing completed successfully!")
         logger.info(f"Service tech commission entries: {len(payroll_entries)}")
@@ -2612,6 +3356,7 @@ def process_payroll(base_path: str, output_dir: str, base_date: datetime, logger
 
 def main():
     """Main program entry point with separated installer and service tech processing."""
+    outputs = None
     try:
         # Display welcome message and instructions
         print("\n" + "="*80)
@@ -2648,32 +3393,46 @@ def main():
 
         output_dir = create_output_directory(base_path, start_of_week, end_of_week, logger)
         combined_file = os.path.join(output_dir, 'combined_data.xlsx')
+        # Output workbooks are written concurrently as each one is final and committed together
+        outputs = OutputStage(output_dir, logger)
 
         # Combine workbooks
         logger.info("Combining workbooks...")
-        combine_workbooks(base_path, combined_file, found_files)
+        if COMBINE_MODE == 'memory':
+            snapshot = combine_workbooks_in_memory(found_files, logger)
+            if WRITE_COMBINED_AUDIT:
+                # Streamed from the source files, not the schema-projected snapshot, while the calculations run
+                outputs.add_writer(combined_file, write_combined_audit, found_files)
+        else:
+            combine_workbooks(base_path, combined_file, found_files)
+            # Parse the combined workbook once for every later stage
+            snapshot = WeekSnapshot.from_workbook(combined_file, logger)
         logger.info("Workbook combination completed!")
 
+        unparsed_money = snapshot.unparsed_money()
+        for issue in unparsed_money.itertuples(index=False):
+            logger.warning(
+                f"Could not parse money value {issue.Value!r} in {issue.Sheet} "
+                f"row {issue.Row}, column '{issue.Column}'; treated as blank"
+            )
+
         # Read and categorize technicians
-        tech_data = read_tech_department_data(combined_file, logger)
-        service_techs = tech_data[tech_data['Technician Business Unit'].apply(
-            lambda x: determine_tech_type(x) == 'SERVICE'
-        )]
-        install_techs = tech_data[tech_data['Technician Business Unit'].apply(
-            lambda x: determine_tech_type(x) == 'INSTALL'
-        )]
+        tech_data = read_tech_department_data(snapshot, logger)
+        tech_types = business_unit_field(tech_data['Technician Business Unit'], 'Tech Type')
+        service_techs = tech_data[tech_types == 'SERVICE']
+        install_techs = tech_data[tech_types == 'INSTALL']
         
         logger.info(f"\nFound {len(service_techs)} service technicians and {len(install_techs)} installers")
         
         # Process service technician calculations and paystats
         logger.info("\nProcessing service technician calculations...")
-        process_calculations(base_path, output_dir, logger, start_of_week, end_of_week)
+        paystats = process_calculations(base_path, output_dir, logger, start_of_week, end_of_week, snapshot, outputs)
 
         # Process payroll entries for service technicians
         logger.info("\nProcessing service technician commission entries...")
         payroll_entries = process_paystats(
-            output_dir, 
-            os.path.join(output_dir, 'paystats.xlsx'), 
+            snapshot, 
+            paystats, 
             tech_data,
             base_date,  # Pass the base_date
             logger
@@ -2682,7 +3441,7 @@ def main():
         # Process installer GP entries
         logger.info("Processing installer GP entries...")
         gp_entries = process_gp_entries(
-            output_dir, 
+            snapshot, 
             install_techs, 
             base_date,  # Pass the base_date
             logger
@@ -2690,29 +3449,38 @@ def main():
         
         # Process TGLs and spiffs for all eligible technicians
         logger.info("Processing TGLs and spiffs for all eligible technicians...")
-        tgl_df, matched_df, pos_df, neg_df = process_adjustments(combined_file, logger)
+        tgl_df, matched_df, pos_df, neg_df = process_adjustments(snapshot, logger)
         
         # Save final outputs
-        all_payroll_entries = payroll_entries + gp_entries
-        save_payroll_file(all_payroll_entries, os.path.join(output_dir, 'payroll.xlsx'), logger)
+        all_payroll_entries = PayrollBatch.concat([payroll_entries, gp_entries])
+        # Negative spiffs are netted against the PCM entries before payroll.xlsx is written
+        netted_entries, unmatched_negatives = net_negative_spiffs(
+            consolidate_payroll_entries(all_payroll_entries, logger), neg_df, logger
+        )
+        save_payroll_file(netted_entries, os.path.join(output_dir, 'payroll.xlsx'), logger, outputs)
         
         # Save adjustment files with the base_date parameter
         save_adjustment_files(
-            tgl_df, matched_df, pos_df, neg_df,
+            tgl_df, matched_df, pos_df, unmatched_negatives,
             os.path.join(output_dir, 'Spiffs.xlsx'),
             os.path.join(output_dir, 'positive_adjustments.xlsx'),
             os.path.join(output_dir, 'negative_adjustments.xlsx'),
             tech_data,
             base_date,
-            logger
+            logger,
+            outputs
         )
 
+        outputs.commit()
+
         logger.info("\nAll processing completed successfully!")
         logger.info(f"Service tech commission entries: {len(payroll_entries)}")
         logger.info(f"Installer GP entries: {len(gp_entries)}")
         logger.info(f"Total payroll entries: {len(all_payroll_entries)}")
 
     except Exception as e:
+        if outputs is not None:
+            outputs.close()
         logger.error(f"Fatal error in main process: {str(e)}")
         sys.exit(1)
 
@@ -0,0 +1,46 @@
+import logging
+import os
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import PayrollPlus
+
+
+def week_jobs():
+    """Jobs of one week for tech A, one of them in a subdepartment missing from SUBDEPARTMENT_MAP."""
+    return pd.DataFrame({
+        'Invoice #': [1, 2, 3],
+        'Invoice Date': pd.to_datetime(['2024-03-05', '2024-03-05', '2024-03-06']),
+        'Customer Name': ['Smith', 'Jones', 'Brown'],
+        'Business Unit': ['26 - Unmapped Service', '20 - HVAC Service', '26 - Unmapped Service'],
+        'Jobs Total Revenue': [100.0, 50.0, 25.0],
+        'GP': [40.0, 20.0, 10.0],
+        'Opportunity': [True, True, False],
+        'Primary Technician': ['A', 'A', 'B'],
+        'Sold By': ['A', 'A', 'A'],
+    })
+
+
+def test_engines_agree_on_unmapped_subdepartment(caplog):
+    assert '26' not in PayrollPlus.SUBDEPARTMENT_MAP
+    data = week_jobs()
+
+    with caplog.at_level(logging.WARNING, logger='commission_processor'):
+        grouped = PayrollPlus.calculate_service_metrics(data, ['A'])['A']
+    grouped_warnings = [r.getMessage() for r in caplog.records if 'not in SUBDEPARTMENT_MAP' in r.getMessage()]
+    caplog.clear()
+
+    with caplog.at_level(logging.WARNING, logger='commission_processor'):
+        box_a, box_b, box_c, breakdown = PayrollPlus.calculate_box_metrics(data, 'A', datetime(2024, 3, 6))
+    per_tech_warnings = [r.getMessage() for r in caplog.records if 'not in SUBDEPARTMENT_MAP' in r.getMessage()]
+
+    assert (box_a, box_b, box_c) == (150.0, 25.0, 175.0)
+    assert (grouped['box_a'], grouped['box_b'], grouped['box_c']) == (box_a, box_b, box_c)
+    assert grouped['subdept_breakdown'] == breakdown
+    assert breakdown['total']['20'] == 50.0
+    assert grouped_warnings == per_tech_warnings
+    assert len(per_tech_warnings) == 1 and '$125.00' in per_tech_warnings[0]